@@ -0,0 +1,127 @@
+#! /usr/bin/env python3
+
+# builds the benchmark's query models one family at a time:
+#
+#     buildhmm.py <benchmark>.train.msa <benchmark>.train.hmm [--cache-dir dir]
+#
+# the training alignments are split by family, hmmbuild is run on the
+# families in parallel, and each family's model is kept in the cache under
+# a hash of its alignment (and of hmmbuild's version and arguments). The
+# models are concatenated in the order of the alignment file, so rebuilding
+# the benchmark only runs hmmbuild for the families whose alignments
+# changed, and gives the same file as building it all at once.
+
+import argparse
+import hashlib
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from runstate import tool_version
+
+HMMBUILD_ARGS = ["--cpu", "1"]
+
+
+def stockholm_alignments(path):
+    # (name, text) of every alignment in a Stockholm file, named by
+    # its #=GF ID line, or its position in the file if it has none
+    with open(path, "rb") as file:
+        lines = []
+        name = None
+        count = 0
+        for line in file:
+            lines.append(line)
+            if line.startswith(b"#=GF ID"):
+                name = line.split()[2].decode()
+            elif line.rstrip() == b"//":
+                yield (name or str(count), b"".join(lines))
+                lines = []
+                name = None
+                count += 1
+
+
+def model_key(text, version):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((version, HMMBUILD_ARGS)).encode())
+    digest.update(text)
+    return digest.hexdigest()
+
+
+def model_path(cache_dir, name, key):
+    name = re.sub(r"[^\w.-]+", "-", name)
+    return cache_dir / f"{name}.{key}.hmm"
+
+
+def build(name, text, out):
+    # written next to the cache entry and moved into place once it's
+    # done, so that an interrupted build never leaves a partial model
+    msa = out.with_name(out.name + ".sto.tmp")
+    tmp = out.with_name(out.name + ".tmp")
+    try:
+        with open(msa, "wb") as file:
+            file.write(text)
+
+        result = subprocess.run(
+            ["hmmbuild", *HMMBUILD_ARGS, "-o", os.devnull, str(tmp), str(msa)],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"hmmbuild failed on {name}:\n{result.stderr}")
+
+        os.replace(tmp, out)
+    finally:
+        for path in [msa, tmp]:
+            if path.exists():
+                path.unlink()
+
+
+def build_models(msa_path, hmm_path, cache_dir, workers):
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    version = tool_version("hmmbuild")
+
+    models = []
+    missing = []
+    for (name, text) in stockholm_alignments(msa_path):
+        path = model_path(cache_dir, name, model_key(text, version))
+        models.append(path)
+        if not path.exists():
+            missing.append((name, text, path))
+
+    print(f"{len(models)} families, {len(missing)} to build")
+
+    with ThreadPoolExecutor(workers) as pool:
+        # every build runs in its own hmmbuild process; list() waits for
+        # them all, and raises the first failure
+        list(pool.map(lambda m: build(*m), missing))
+
+    tmp = hmm_path.with_name(hmm_path.name + ".tmp")
+    with open(tmp, "wb") as out:
+        for path in models:
+            with open(path, "rb") as file:
+                out.write(file.read())
+    os.replace(tmp, hmm_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="build one model per family of a Stockholm file, in "
+        "parallel, reusing the models of families that haven't changed")
+    parser.add_argument("msa", type=Path)
+    parser.add_argument("hmm", type=Path)
+    parser.add_argument("--cache-dir", type=Path,
+                        help="where to keep the models of each family "
+                        "(default: hmmbuild-cache/ next to the output)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of hmmbuild processes run at once")
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or args.hmm.parent / "hmmbuild-cache/"
+
+    try:
+        build_models(args.msa, args.hmm, cache_dir, args.workers)
+    except RuntimeError as e:
+        sys.exit(str(e))
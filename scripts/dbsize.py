@@ -0,0 +1,229 @@
+#! /usr/bin/env python3
+
+# measures how runtime and throughput grow with the size of the target
+# database:
+#
+#     dbsize.py <benchmark-dir> [--fractions 0.1 0.25 0.5 1] [--seed 0]
+#
+# the subsets of the test database are nested, i.e. each one holds all of
+# the sequences of the smaller ones, and each keeps the full database's
+# ratio of planted positives to decoys: the positives and the decoys are
+# each shuffled once, by seed, and every subset takes the same leading
+# fraction of both. Every subset is a benchmark directory of its own under
+# results/dbsize/<percent>/, sharing the full benchmark's queries, and
+# every configuration of the regular runs is run on each one. A power law
+# of runtime against database residues is fit to each configuration.
+
+import argparse
+import asyncio
+import mmap
+import os
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from jobs import TOOLS, Paths, dbsize_jobs, rusage_path
+from orchestrate import Scheduler
+from runstate import RunState, read_json, write_json
+from scaling import fit_power
+from seqindex import FASTA_HEADER
+from shards import fasta_records
+
+DBSIZE_FRACTIONS = [0.1, 0.25, 0.5, 1.0]
+
+# the timed runs of every subset: config -> time file, below its results
+DBSIZE_CONFIGS = {
+    "hmmer": "hmmer/hmmer.time",
+    "nail-default": "nail/nail.default.time",
+    "nail-full": "nail/nail.full.time",
+    "nail-no-filters": "nail/nail.no-filters.time",
+    "mmseqs-default": "mmseqs/mmseqs.default.time",
+    "mmseqs-sensitive": "mmseqs/mmseqs.sensitive.time",
+    "mmseqs-nail": "mmseqs/mmseqs.nail.time",
+}
+
+
+def subset_label(fraction):
+    return f"{fraction * 100:g}"
+
+
+def take(items, fraction):
+    return items[:round(fraction * len(items))]
+
+
+def write_subsets(paths, fractions, dbsize_dir, seed):
+    # writes each subset's benchmark directory, and returns a
+    # description of each
+    with open(paths.benchmark_dir / f"{paths.name}.pos") as file:
+        pos_lines = file.readlines()
+
+    positive_labels = {line.split()[0] for line in pos_lines}
+
+    subsets = []
+    with open(paths.target, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            records = fasta_records(mm)
+            names = [m.group(1).decode() for m in FASTA_HEADER.finditer(mm)]
+
+            positives = [i for (i, n) in enumerate(names) if n in positive_labels]
+            decoys = [i for (i, n) in enumerate(names) if n not in positive_labels]
+
+            rng = random.Random(seed)
+            rng.shuffle(positives)
+            rng.shuffle(decoys)
+
+            for fraction in sorted(fractions):
+                label = subset_label(fraction)
+                subset_dir = dbsize_dir / f"{label}/{paths.name}/"
+                subset_dir.mkdir(parents=True, exist_ok=True)
+
+                # the queries are the full benchmark's
+                for suffix in ["train.hmm", "train.msa"]:
+                    link = subset_dir / f"{paths.name}.{suffix}"
+                    source = paths.benchmark_dir / f"{paths.name}.{suffix}"
+                    if source.exists() and not link.exists():
+                        os.symlink(source.resolve(), link)
+
+                kept_positives = take(positives, fraction)
+                kept_decoys = take(decoys, fraction)
+
+                # so that plots.py scores the subset against its own positives
+                kept_labels = {names[i] for i in kept_positives}
+                with open(subset_dir / f"{paths.name}.pos", "w") as out:
+                    out.writelines(line for line in pos_lines
+                                   if line.split()[0] in kept_labels)
+
+                # in the full database's order
+                kept = sorted(kept_positives + kept_decoys)
+
+                # the whole database is linked to rather than copied
+                target = subset_dir / f"{paths.name}.test.fa"
+                if target.is_symlink() or target.exists():
+                    target.unlink()
+                if len(kept) == len(records):
+                    os.symlink(paths.target.resolve(), target)
+                else:
+                    with open(target, "wb") as out:
+                        for i in kept:
+                            (start, end, _) = records[i]
+                            out.write(mm[start:end])
+
+                subsets.append({
+                    "label": label,
+                    "fraction": fraction,
+                    "dir": str(subset_dir),
+                    "sequences": len(kept),
+                    "residues": sum(records[i][2] for i in kept),
+                    "positives": len(kept_positives),
+                    "decoys": len(kept_decoys),
+                })
+
+    return subsets
+
+
+def subset_paths(subset):
+    return Paths(Path(subset["dir"]))
+
+
+def read_dbsize(dbsize_dir):
+    # config -> (residues, seconds) arrays, over every finished run
+    subsets = read_json(dbsize_dir / "subsets.json") or []
+
+    runs = {}
+    for (config, time) in DBSIZE_CONFIGS.items():
+        points = []
+        for subset in subsets:
+            results = subset_paths(subset).results_root
+            record = read_json(rusage_path(results / time))
+            if record is None or record["exit_code"] != 0:
+                continue
+            points.append((subset["residues"], record["real"]))
+
+        if points:
+            runs[config] = tuple(np.array(c, dtype=np.float64)
+                                 for c in zip(*points))
+
+    return runs
+
+
+def fit_dbsize(runs, extrapolate=None):
+    # config -> (runs, time exponent, residues/sec on the largest subset,
+    # the fitted runtime for `extrapolate` residues)
+    fits = {}
+    for (config, (residues, seconds)) in runs.items():
+        if len(np.unique(residues)) < 2:
+            continue
+
+        (coef, exponent) = fit_power(residues, seconds)
+        largest = np.argmax(residues)
+
+        projected = np.nan
+        if extrapolate is not None:
+            projected = coef * extrapolate ** exponent
+
+        fits[config] = (len(residues), exponent,
+                        residues[largest] / seconds[largest], projected)
+
+    return fits
+
+
+def write_fits(fits, path):
+    with open(path, "w") as file:
+        file.write("config\truns\ttime_exponent\tresidues_per_sec\t"
+                   "extrapolated_seconds\n")
+        for (config, (n, exponent, rate, projected)) in fits.items():
+            file.write(f"{config}\t{n}\t{exponent:.3f}\t{rate:.4g}\t"
+                       f"{projected:.4g}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="measure runtime and throughput against the size of the "
+        "target database, on nested subsets of it")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("--fractions", type=float, nargs="+",
+                        default=DBSIZE_FRACTIONS)
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=TOOLS)
+    parser.add_argument("--extrapolate", type=float, metavar="RESIDUES",
+                        help="also report each fit's runtime for a database "
+                        "of this many residues")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-t", "--threads", type=int, default=1)
+    parser.add_argument("--cores", type=int, default=os.cpu_count())
+    parser.add_argument("--results-dir", type=Path)
+    parser.add_argument("--report", action="store_true",
+                        help="only refit the finished runs")
+    args = parser.parse_args()
+
+    paths = Paths(args.benchmark_dir, args.results_dir)
+    dbsize_dir = paths.results("dbsize")
+
+    if not args.report:
+        if not all(0 < f <= 1 for f in args.fractions):
+            parser.error("--fractions must be in (0, 1]")
+
+        subsets = write_subsets(paths, args.fractions, dbsize_dir, args.seed)
+        write_json(dbsize_dir / "subsets.json", subsets)
+
+        # the runs are compared by runtime, so they never share the machine
+        scheduler = Scheduler(args.cores, exclusive_timed=True,
+                              state=RunState(paths.results_root / ".runs/"))
+        failed = asyncio.run(scheduler.run(dbsize_jobs(
+            [(s["label"], subset_paths(s)) for s in subsets],
+            args.threads,
+            args.tools,
+        )))
+
+        if failed:
+            print(f"failed: {', '.join(j.name for j in failed)}")
+
+    fits = fit_dbsize(read_dbsize(dbsize_dir), args.extrapolate)
+    if not fits:
+        sys.exit("not enough finished runs to fit")
+
+    write_fits(fits, dbsize_dir / "fits.tsv")
+
+    with open(dbsize_dir / "fits.tsv") as file:
+        print(file.read(), end="")
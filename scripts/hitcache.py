@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from hits import FIELDS, Hits, HitTable, read_hits, rules
+
+DIGEST_BLOCK = 1 << 20
+
+
+class HitCache:
+    # a persistent cache of parsed and classified hit tables.
+    #
+    # every result file gets one entry directory, named by a hash of
+    # its path and the classification rules, which holds one .npy
+    # file per column plus a manifest. An entry is reused as long as
+    # the file's content digest matches the manifest; the digest is
+    # only recomputed when the file's size or mtime has changed.
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.digests = {}
+
+    def entry_dir(self, path, cols):
+        key = json.dumps(
+            {"path": str(path.resolve()), "rules": rules(cols)},
+            sort_keys=True,
+        )
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return self.cache_dir / f"{path.name}.{digest}"
+
+    def load(self, path, cols):
+        hits = self.lookup(path, cols)
+        if hits is None:
+            hits = read_hits(path, cols)
+            self.store(path, cols, hits)
+
+        return hits
+
+    def lookup(self, path, cols):
+        # returns the cached hits for a result file, or None
+        # if the file has to be (re-)parsed and stored
+        entry = self.entry_dir(path, cols)
+        manifest = read_manifest(entry)
+
+        stamp = file_stamp(path)
+
+        if manifest is None:
+            return None
+
+        if all(manifest[k] == v for (k, v) in stamp.items()):
+            return load_entry(entry, manifest)
+
+        # the file was touched or rewritten; if the contents are
+        # the same we can still use the entry after restamping it
+        digest = self.digest(path)
+        if manifest["digest"] != digest:
+            return None
+
+        manifest.update(stamp)
+        write_manifest(entry, manifest)
+
+        return load_entry(entry, manifest)
+
+    def store(self, path, cols, hits):
+        manifest = {
+            "path": str(path.resolve()),
+            "name": hits.name,
+            "digest": self.digest(path),
+            "rules": rules(cols),
+            **file_stamp(path),
+        }
+
+        try:
+            write_entry(self.entry_dir(path, cols), hits, manifest)
+        except OSError:
+            # we can always fall back to parsing the file next time
+            pass
+
+    def digest(self, path):
+        # a file's digest is needed by both lookup() and store(), so
+        # remember it for as long as the file's stamp stays the same
+        key = (str(path.resolve()), *file_stamp(path).values())
+        if key not in self.digests:
+            self.digests[key] = file_digest(path)
+
+        return self.digests[key]
+
+
+def file_stamp(path):
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def file_digest(path):
+    digest = hashlib.blake2b()
+    with open(path, "rb") as file:
+        while block := file.read(DIGEST_BLOCK):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def read_manifest(entry):
+    try:
+        with open(entry / "manifest.json") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(entry, manifest):
+    tmp = entry / "manifest.json.tmp"
+    with open(tmp, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp, entry / "manifest.json")
+
+
+def write_entry(entry, hits, manifest):
+    # write into a scratch directory and swap it in, so
+    # that an interrupted write never leaves a bad entry
+    tmp = entry.with_name(entry.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    table = hits.table
+    arrays = {
+        "query_names": table.query_names,
+        "target_names": table.target_names,
+        "true_positive": hits.true_positive,
+        "false_positive": hits.false_positive,
+        **table.columns(),
+    }
+
+    for (name, array) in arrays.items():
+        np.save(tmp / f"{name}.npy", np.ascontiguousarray(array))
+
+    manifest["arrays"] = list(arrays)
+    write_manifest(tmp, manifest)
+
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+
+
+def load_entry(entry, manifest):
+    arrays = {
+        name: np.load(entry / f"{name}.npy", mmap_mode="r")
+        for name in manifest["arrays"]
+    }
+
+    table = HitTable(
+        arrays["query_names"],
+        arrays["target_names"],
+        **{f: arrays[f] for f in FIELDS if f in arrays}
+    )
+
+    return Hits(
+        manifest["name"],
+        table,
+        np.asarray(arrays["true_positive"]),
+        np.asarray(arrays["false_positive"]),
+    )
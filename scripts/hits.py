@@ -0,0 +1,511 @@
+from functools import cached_property
+from itertools import islice
+from operator import itemgetter
+
+import numpy as np
+
+# the number of result lines that are tokenized before they
+# are converted into numpy columns, which bounds the number
+# of python string objects that are alive at any one time
+CHUNK_LINES = 1 << 20
+
+INT_FIELDS = [
+    "target_start",
+    "target_end",
+    "query_start",
+    "query_end",
+]
+
+FLOAT_FIELDS = [
+    "evalue",
+    "score",
+    "bias",
+    "cell_frac",
+]
+
+FIELDS = ["target", "query"] + INT_FIELDS + FLOAT_FIELDS
+
+# the fraction of a planted domain that a hit has to
+# cover to be counted as a true positive
+TRUE_POSITIVE_OVERLAP = 0.50
+
+# bump this whenever read_hits() or classify() change the way
+# hits are classified, so that cached hit tables are rebuilt
+RULES_VERSION = 2
+
+
+class Cols:
+    def __init__(
+        self,
+        target,
+        query,
+        evalue,
+        target_start=None,
+        target_end=None,
+        query_start=None,
+        query_end=None,
+        score=None,
+        bias=None,
+        cell_frac=None,
+    ):
+        self.target = target
+        self.query = query
+        self.target_start = target_start
+        self.target_end = target_end
+        self.query_start = query_start
+        self.query_end = query_end
+        self.evalue = evalue
+        self.score = score
+        self.bias = bias
+        self.cell_frac = cell_frac
+
+    def fields(self):
+        return [f for f in FIELDS if getattr(self, f) is not None]
+
+    def has_target_coords(self):
+        return self.target_start is not None and self.target_end is not None
+
+
+class HitTable:
+    # a columnar table of hits: one typed array per column, with
+    # the query and target names integer-encoded against the
+    # query_names and target_names vocabularies
+    def __init__(
+        self,
+        query_names,
+        target_names,
+        query,
+        target,
+        evalue,
+        target_start=None,
+        target_end=None,
+        query_start=None,
+        query_end=None,
+        score=None,
+        bias=None,
+        cell_frac=None,
+    ):
+        self.query_names = query_names
+        self.target_names = target_names
+        self.query = query
+        self.target = target
+        self.target_start = target_start
+        self.target_end = target_end
+        self.query_start = query_start
+        self.query_end = query_end
+        self.evalue = evalue
+        self.score = score
+        self.bias = bias
+        self.cell_frac = cell_frac
+
+    def __len__(self):
+        return len(self.evalue)
+
+    def columns(self):
+        return {
+            f: getattr(self, f) for f in FIELDS
+            if getattr(self, f) is not None
+        }
+
+    def take(self, index):
+        # index may be a boolean mask or an array of row indices;
+        # the name vocabularies are shared with the new table
+        return HitTable(
+            self.query_names,
+            self.target_names,
+            **{f: c[index] for (f, c) in self.columns().items()}
+        )
+
+    @property
+    def query_name(self):
+        return self.query_names[self.query]
+
+    @property
+    def target_name(self):
+        return self.target_names[self.target]
+
+
+def parse_hits(path, cols):
+    with open(path) as file:
+        return parse_lines(file, cols)
+
+
+def parse_hits_range(path, cols, start, end):
+    # parse the lines in the byte range [start, end) of a file;
+    # both ends are expected to be on line boundaries
+    with open(path, "rb") as file:
+        file.seek(start)
+        return parse_lines(range_lines(file, end - start), cols)
+
+
+def range_lines(file, size):
+    remaining = size
+    while remaining > 0:
+        line = file.readline(remaining)
+        if not line:
+            break
+
+        remaining -= len(line)
+        yield line.decode()
+
+
+def parse_lines(lines, cols):
+    fields = cols.fields()
+    indices = [getattr(cols, f) for f in fields]
+    getter = itemgetter(*indices)
+    # we only need to split as far as the last column we use, which
+    # keeps free-text description columns (e.g. in domtbls) in one piece
+    width = max(indices) + 1
+
+    query_vocab = {}
+    target_vocab = {}
+    chunks = {f: [] for f in fields}
+
+    while True:
+        chunk = list(islice(lines, CHUNK_LINES))
+        if not chunk:
+            break
+
+        rows = [
+            getter(line.split(None, width))
+            for line in chunk
+            if not line.startswith("#") and line.strip()
+        ]
+
+        if not rows:
+            continue
+
+        for (f, values) in zip(fields, zip(*rows)):
+            if f == "query":
+                column = encode(values, query_vocab)
+            elif f == "target":
+                column = encode(values, target_vocab)
+            elif f in INT_FIELDS:
+                column = np.array(values, dtype=np.int64)
+            else:
+                column = np.array(values, dtype=np.float64)
+
+            chunks[f].append(column)
+
+    columns = {}
+    for f in fields:
+        if chunks[f]:
+            columns[f] = np.concatenate(chunks[f])
+        elif f in ("query", "target"):
+            columns[f] = np.zeros(0, dtype=np.int32)
+        elif f in INT_FIELDS:
+            columns[f] = np.zeros(0, dtype=np.int64)
+        else:
+            columns[f] = np.zeros(0, dtype=np.float64)
+
+    return HitTable(
+        vocab_names(query_vocab),
+        vocab_names(target_vocab),
+        **columns
+    )
+
+
+def concat_tables(tables):
+    # merge tables that were parsed separately (e.g. byte ranges of one
+    # file) by re-encoding their names against a shared vocabulary
+    query_vocab = {}
+    target_vocab = {}
+    chunks = {}
+
+    for table in tables:
+        query_codes = encode(table.query_names, query_vocab)
+        target_codes = encode(table.target_names, target_vocab)
+
+        for (f, column) in table.columns().items():
+            if f == "query":
+                column = query_codes[column]
+            elif f == "target":
+                column = target_codes[column]
+
+            chunks.setdefault(f, []).append(column)
+
+    return HitTable(
+        vocab_names(query_vocab),
+        vocab_names(target_vocab),
+        **{f: np.concatenate(c) for (f, c) in chunks.items()}
+    )
+
+
+def encode(values, vocab):
+    return np.array(
+        [vocab.setdefault(v, len(vocab)) for v in values],
+        dtype=np.int32
+    )
+
+
+def vocab_names(vocab):
+    # dicts preserve insertion order, which is the code order
+    return np.array(list(vocab), dtype=np.str_)
+
+
+def expand(starts, counts):
+    # expand runs of consecutive indices: run i covers
+    # starts[i]:starts[i] + counts[i], and comes out tagged with i
+    owner = np.repeat(np.arange(len(counts)), counts)
+    run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    index = np.repeat(starts, counts) + (np.arange(len(owner)) - run_starts)
+
+    return (owner, index)
+
+
+class PlantIndex:
+    # an interval index of the domains planted in every target, parsed
+    # out of the target names, which are formatted like:
+    #     <target_name>/<id>/<from>-<to>[/<from>-<to>...], or
+    #     <decoy#>
+    #
+    # the domains are kept as flat arrays sorted by target and then by
+    # start; the domains of target i are offsets[i]:offsets[i + 1]
+    def __init__(self, target_names, query_names):
+        n = len(target_names)
+        query_codes = {name: code for (code, name) in enumerate(query_names)}
+
+        self.decoy = np.zeros(n, dtype=bool)
+        # the target family encoded against the query vocabulary,
+        # or -1 if no query has the same name as the family
+        self.family = np.full(n, -1, dtype=np.int32)
+        self.num_domains = np.zeros(n, dtype=np.int64)
+
+        starts = []
+        ends = []
+
+        for (i, target) in enumerate(target_names):
+            if target.startswith("decoy"):
+                self.decoy[i] = True
+                continue
+
+            target_tokens = target.split("/")
+            self.family[i] = query_codes.get(target_tokens[0], -1)
+
+            domains = parse_domains(target_tokens[2:])
+            self.num_domains[i] = len(domains)
+            for (start, end) in domains:
+                starts.append(start)
+                ends.append(end)
+
+        self.offsets = np.concatenate([[0], np.cumsum(self.num_domains)])
+        self.start = np.array(starts, dtype=np.int64)
+        self.end = np.array(ends, dtype=np.int64)
+
+    def planted(self, target):
+        return self.num_domains[target] > 0
+
+    def best_overlap(self, target, target_start, target_end):
+        # for every hit, the largest fraction of any one of its target's
+        # planted domains that it covers, in one sweep over all of the
+        # (hit, domain) pairs
+        counts = self.num_domains[target]
+        (hit, domain) = expand(self.offsets[target], counts)
+
+        overlap_start = np.maximum(self.start[domain], target_start[hit])
+        overlap_end = np.minimum(self.end[domain], target_end[hit])
+        overlap = np.maximum(overlap_end - overlap_start + 1, 0)
+
+        domain_length = self.end[domain] - self.start[domain] + 1
+        fraction = overlap / domain_length
+
+        best = np.zeros(len(target))
+        located = counts > 0
+        if located.any():
+            run_starts = (np.cumsum(counts) - counts)[located]
+            best[located] = np.maximum.reduceat(fraction, run_starts)
+
+        return best
+
+
+def parse_domains(tokens):
+    # ["<from>-<to>", ...] -> [(from, to), ...] sorted by start,
+    # or no domains at all if any of the tokens isn't a range
+    domains = []
+    for token in tokens:
+        coords = token.split("-")
+        if len(coords) != 2 or not all(c.isdigit() for c in coords):
+            return []
+
+        domains.append((int(coords[0]), int(coords[1])))
+
+    return sorted(domains)
+
+
+class Hits:
+    def __init__(self, name, table, true_positive, false_positive):
+        self.name = name
+
+        self.table = table
+        self.true_positive = true_positive
+        self.false_positive = false_positive
+
+        self._recall_cache = {}
+
+    def num_hits(self):
+        return len(self.table)
+
+    # the subtables are copies of the columns they take from, so they're
+    # only built when asked for, and the (memory-mapped) table is left as is
+    @cached_property
+    def other_mask(self):
+        return ~(self.true_positive | self.false_positive)
+
+    @cached_property
+    def true_positives(self):
+        return self.table.take(self.true_positive)
+
+    @cached_property
+    def false_positives(self):
+        return self.table.take(self.false_positive)
+
+    @cached_property
+    def other(self):
+        return self.table.take(self.other_mask)
+
+    @cached_property
+    def roc(self):
+        assert (np.unique(self.true_positives.target).size
+                == len(self.true_positives))
+
+        return Roc(self.true_positives.evalue, self.false_positives.evalue)
+
+    def recall_vs_mean_false(self, num_true_positives, num_queries):
+        key = (num_true_positives, num_queries)
+        if key not in self._recall_cache:
+            self._recall_cache[key] = self.roc.recall_vs_mean_false(
+                num_true_positives, num_queries)
+
+        return self._recall_cache[key]
+
+
+class Roc:
+    # cumulative true and false positive counts down the E-value
+    # ranking of the true and false positives of one set of hits
+    def __init__(self, true_evalue, false_evalue):
+        evalue = np.concatenate([true_evalue, false_evalue])
+        is_true = np.concatenate([
+            np.ones(len(true_evalue), dtype=bool),
+            np.zeros(len(false_evalue), dtype=bool),
+        ])
+
+        # stable, so that true positives go first on E-value ties
+        order = np.argsort(evalue, kind="stable")
+
+        self.evalue = evalue[order]
+        self.true_count = np.cumsum(is_true[order])
+        self.false_count = np.arange(1, len(order) + 1) - self.true_count
+
+    def __len__(self):
+        return len(self.evalue)
+
+    def first_false_positive(self):
+        # the rank of the first false positive, or None if there are none
+        idx = np.searchsorted(self.false_count, 1)
+        if idx == len(self):
+            return None
+
+        return idx
+
+    def fdr_index(self, target=0.01, tolerance=1e-3):
+        # the first rank at which the false discovery
+        # rate is within tolerance of the target
+        with np.errstate(divide="ignore", invalid="ignore"):
+            false_discovery_rate = self.false_count / self.true_count
+
+        near = np.abs(target - false_discovery_rate) < tolerance
+        if not near.any():
+            return None
+
+        idx = np.argmax(near)
+
+        return idx
+
+    def recall_vs_mean_false(self, num_true_positives, num_queries):
+        x = self.false_count / num_queries
+        y = self.true_count / num_true_positives
+
+        y_first = 0
+        idx = self.first_false_positive()
+        if idx is not None and idx > 0:
+            y_first = y[idx - 1]
+
+        fdr_point = (0, 0)
+        idx = self.fdr_index()
+        if idx is not None:
+            fdr_point = (x[idx], y[idx])
+
+        return (x, y, y_first, fdr_point)
+
+
+def hits_name(path):
+    return " ".join(path.name.split(".")[:-1])
+
+
+def read_hits(path, cols):
+    return classify_hits(hits_name(path), parse_hits(path, cols), cols)
+
+
+def classify_hits(name, table, cols):
+    # everything downstream expects E-value order; the sort is
+    # stable so that ties keep their order in the file
+    table = table.take(np.argsort(table.evalue, kind="stable"))
+
+    (true_positive, false_positive) = classify(table, cols)
+
+    # some tools (e.g. hmmer) report one line per domain, and a target
+    # may have more than one planted domain; a target is only found
+    # once, so only keep the best true positive per (query, target)
+    keep = ~true_positive
+    tp_index = np.flatnonzero(true_positive)
+    key = (table.query[tp_index].astype(np.int64) * len(table.target_names)
+           + table.target[tp_index])
+    (_, first) = np.unique(key, return_index=True)
+    keep[tp_index[first]] = True
+
+    if not keep.all():
+        table = table.take(keep)
+        true_positive = true_positive[keep]
+        false_positive = false_positive[keep]
+
+    return Hits(name, table, true_positive, false_positive)
+
+
+def rules(cols):
+    # everything that read_hits() output depends on, other than the
+    # contents of the result file; cached tables are keyed by this
+    return {
+        "version": RULES_VERSION,
+        "overlap": TRUE_POSITIVE_OVERLAP,
+        "cols": {f: getattr(cols, f) for f in FIELDS},
+    }
+
+
+def classify(table, cols):
+    plants = PlantIndex(table.target_names, table.query_names)
+
+    decoy = plants.decoy[table.target]
+    same_family = plants.family[table.target] == table.query
+
+    if cols.has_target_coords():
+        # only targets that carry planted coordinates
+        # can be scored by their overlap with the plants
+        located = plants.planted(table.target)
+        overlap_percentage = plants.best_overlap(
+            table.target, table.target_start, table.target_end)
+    else:
+        located = np.zeros(len(table), dtype=bool)
+        overlap_percentage = np.zeros(len(table))
+
+    true_positive = (
+        ~decoy
+        & same_family
+        & (~located | (overlap_percentage >= TRUE_POSITIVE_OVERLAP))
+    )
+
+    false_positive = (
+        decoy
+        | (located & same_family & (overlap_percentage == 0.0))
+    )
+
+    return (true_positive, false_positive)
@@ -0,0 +1,96 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from hits import (
+    classify_hits,
+    concat_tables,
+    hits_name,
+    parse_hits_range,
+    read_hits,
+)
+
+# files bigger than this are split into byte ranges that are
+# parsed in parallel, at most one range per worker
+RANGE_BYTES = 64 << 20
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def read_results(paths, cols, cache=None, workers=1):
+    paths = sorted(paths)
+
+    hits = {}
+    if cache is not None:
+        for path in paths:
+            cached = cache.lookup(path, cols)
+            if cached is not None:
+                hits[path] = cached
+
+    missing = [p for p in paths if p not in hits]
+
+    if workers <= 1:
+        for path in missing:
+            hits[path] = read_hits(path, cols)
+    else:
+        hits.update(parse_parallel(missing, cols, workers))
+
+    if cache is not None:
+        for path in missing:
+            cache.store(path, cols, hits[path])
+
+    return [hits[p] for p in paths]
+
+
+def parse_parallel(paths, cols, workers):
+    if not paths:
+        return {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            path: [
+                pool.submit(parse_hits_range, path, cols, start, end)
+                for (start, end) in split_ranges(path, workers)
+            ]
+            for path in paths
+        }
+
+        # the ranges of each file are merged back in file order, so
+        # the merged table is the same as a serial parse would give
+        return {
+            path: classify_hits(
+                hits_name(path),
+                concat_tables([f.result() for f in range_futures]),
+                cols,
+            )
+            for (path, range_futures) in futures.items()
+        }
+
+
+def split_ranges(path, workers):
+    # split a file into at most `workers` byte ranges of about
+    # equal size, with every boundary moved up to a line start
+    size = path.stat().st_size
+    n = max(1, min(workers, size // RANGE_BYTES))
+
+    boundaries = [0]
+    with open(path, "rb") as file:
+        for i in range(1, n):
+            offset = size * i // n
+            if offset <= boundaries[-1]:
+                continue
+
+            file.seek(offset - 1)
+            # if the byte before the split is a newline we are already
+            # at a line start, otherwise skip to the end of the line
+            if file.read(1) != b"\n":
+                file.readline()
+
+            offset = file.tell()
+            if boundaries[-1] < offset < size:
+                boundaries.append(offset)
+
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
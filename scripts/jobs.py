@@ -0,0 +1,973 @@
+import re
+import shutil
+from functools import partial
+from pathlib import Path
+
+from seqindex import fasta_lengths
+from shards import (manifest_path, merge_domtblout, merge_tables, merge_tblout,
+                    merge_times, read_manifest, residue_scales, sequence_scales,
+                    shard_path, split_fasta)
+from timeline import timeline_path
+
+E = "1e9"
+
+# the mmseqs prefilter settings that nail uses, which are
+# also used for the "mmseqs nail pipeline settings" run
+K = 6
+K_SCORE = 80
+MIN_UNGAPPED_SCORE = 15
+MAX_SEQS = 1000
+
+# the mmseqs search output lines that are worth echoing after each run
+MMSEQS_REPORT = [
+    "Index table k-mer threshold:",
+    "k-mer similarity threshold: ",
+]
+
+TOOLS = ["nail", "mmseqs", "hmmer"]
+
+# the E-value columns of the nail and mmseqs tables, as read by plots.py
+NAIL_EVALUE = 8
+MMSEQS_EVALUE = 6
+
+
+class Job:
+    # one step of a benchmark run: either an external command or a python
+    # action. Timed jobs are wrapped in timed.py, which writes `time`.
+    def __init__(
+        self,
+        name,
+        command=None,
+        action=None,
+        threads=1,
+        time=None,
+        stdout=None,
+        after=(),
+        inputs=(),
+        outputs=(),
+        lock=None,
+        group=None,
+        report=(),
+        repeat=True,
+    ):
+        assert (command is None) != (action is None)
+
+        self.name = name
+        self.command = command
+        self.action = action
+        self.threads = threads
+        self.time = time
+        self.stdout = stdout
+        self.after = list(after)
+        # the files the job reads that no other job writes, and the
+        # files it writes; a job without outputs is run every time
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        if time is not None:
+            self.outputs += [time, rusage_path(time)]
+        # jobs that share a lock never run at the same time
+        self.lock = lock
+        # timed jobs of the same group, e.g. the shards of one search,
+        # share the machine with each other, but with nothing else
+        self.group = group
+        # lines of stdout that start with these are echoed when it's done
+        self.report = list(report)
+        # one-off preparation steps are timed, but never repeated as trials
+        self.repeat = repeat
+
+        # how many times a timed job is run, and whether the page cache
+        # is emptied of the files it reads before each run
+        self.trials = 1
+        self.cold = False
+        # how often timed.py samples a timed job's process tree, if at all
+        self.sample = None
+
+    def timed(self):
+        return self.time is not None
+
+    def set_trials(self, trials, cold=False):
+        assert self.timed()
+
+        self.trials = trials
+        self.cold = cold
+        if self.repeated():
+            for time in self.trial_times():
+                self.outputs += [time, rusage_path(time)]
+
+    def set_sample(self, interval):
+        assert self.timed()
+
+        self.sample = interval
+        for time in [self.time, *(self.trial_times() if self.repeated() else [])]:
+            self.outputs.append(timeline_path(time))
+
+    def repeated(self):
+        return self.trials > 1 or self.cold
+
+    def trial_times(self):
+        # every trial's record, next to the job's own one, which is
+        # a copy of the median trial's
+        return [self.time.parent / f"trials/{self.time.stem}.{i}.time"
+                for i in range(self.trials)]
+
+    def __repr__(self):
+        return f"Job({self.name!r})"
+
+
+class Paths:
+    def __init__(self, benchmark_dir, results_root=None):
+        self.benchmark_dir = benchmark_dir
+        self.name = benchmark_dir.name
+
+        self.target = benchmark_dir / f"{self.name}.test.fa"
+        self.query_hmm = benchmark_dir / f"{self.name}.train.hmm"
+        self.query_msa = benchmark_dir / f"{self.name}.train.msa"
+
+        self.long_seq_dir = benchmark_dir / "long-seq/"
+
+        if results_root is None:
+            results_root = benchmark_dir / "results/"
+
+        self.results_root = results_root
+
+    def results(self, tool):
+        return self.results_root / tool
+
+    def long_seq_pairs(self):
+        # (i, query, target) for every <i>.query.fa / <i>.target.fa pair
+        pairs = []
+        for query in (self.long_seq_dir / "query/").glob("*.query.fa"):
+            i = query.name.split(".")[0]
+            target = self.long_seq_dir / f"target/{i}.target.fa"
+            if target.exists():
+                pairs.append((i, query, target))
+
+        return sorted(pairs, key=lambda p: int(p[0]) if p[0].isdigit() else p[0])
+
+
+def rusage_path(time_path):
+    return time_path.with_name(time_path.stem + ".rusage.json")
+
+
+def make_dirs(*dirs):
+    for d in dirs:
+        d.mkdir(parents=True, exist_ok=True)
+
+
+def concatenate(paths, out):
+    with open(out, "wb") as out_file:
+        for path in paths:
+            with open(path, "rb") as file:
+                shutil.copyfileobj(file, out_file)
+
+
+# flag -> value of the parameters that every nail run sets
+NAIL_PARAMS = {
+    "--mmseqs-k": K,
+    "--mmseqs-k-score": K_SCORE,
+    "--mmseqs-min-ungapped_score": MIN_UNGAPPED_SCORE,
+    "--mmseqs-max-seqs": MAX_SEQS,
+}
+
+
+def nail_search(query, target, prep, threads, tsv=None, out=None, args=(),
+                params=None):
+    # `params` override NAIL_PARAMS; a value of None leaves the flag
+    # out, i.e. it falls back to nail's own default
+    command = ["nail", "search", "-t", threads, "-E", E]
+    if tsv is not None:
+        command += ["-T", tsv]
+    if out is not None:
+        command += ["-O", out]
+
+    command += ["--prep", prep, *args]
+
+    for (flag, value) in {**NAIL_PARAMS, **(params or {})}.items():
+        if value is not None:
+            command += [flag, value]
+
+    command += [query, target]
+
+    return command
+
+
+def nail_prep(query, target, prep, threads, time, after, label, group=None):
+    # builds the --prep directory that every `nail search` with the same
+    # query and target reuses, so that none of them pays for it
+    return Job(
+        label,
+        command=["nail", "prep", "-t", threads, "--prep", prep, query, target],
+        threads=threads,
+        time=time,
+        after=after,
+        inputs=[query, target],
+        # so that a deleted prep directory is rebuilt
+        outputs=[prep],
+        lock=prep,
+        group=group,
+        repeat=False,
+    )
+
+
+# name -> extra `nail search` arguments
+NAIL_CONFIGS = {
+    "default": [],
+    "full": ["--full-dp"],
+    "no-filters": ["--forward-thresh", "1e9", "--cloud-thresh", "1e9"],
+}
+
+
+class Shards:
+    # the target database, split into `count` shards of about the same
+    # number of residues; the split is shared by all of the tools
+    def __init__(self, paths, count):
+        self.count = count
+        self.dir = paths.results_root / f"shards/{count}/"
+
+        # hmmer computes its shards' sequence E-values against the whole
+        # database
+        self.total_sequences = len(fasta_lengths(paths.target))
+
+        self.split = Job(
+            f"split target into {count} shards",
+            action=lambda: split_fasta(paths.target, count, self.dir),
+            inputs=[paths.target],
+            outputs=[manifest_path(self.dir), *self.targets()],
+        )
+
+    def targets(self):
+        return [shard_path(self.dir, k) for k in range(self.count)]
+
+    def dirs(self, results):
+        # where each shard's results go, below the tool's results directory
+        return [results / f"shards/{k}/" for k in range(self.count)]
+
+    def runs(self, results):
+        # (k, target, results directory) for every shard
+        return list(zip(range(self.count), self.targets(), self.dirs(results)))
+
+    def manifest(self):
+        return read_manifest(self.dir)
+
+
+def merged_outputs(time):
+    return [time, rusage_path(time)]
+
+
+def nail_run(paths, threads, name, args, target, out_dir, after, inputs,
+             label, group=None):
+    prep = out_dir / "prep/"
+    return Job(
+        label,
+        command=nail_search(
+            paths.query_hmm,
+            target,
+            prep,
+            threads,
+            tsv=out_dir / f"nail.{name}.tsv",
+            out=out_dir / f"nail.{name}.out",
+            args=args,
+        ),
+        threads=threads,
+        time=out_dir / f"nail.{name}.time",
+        stdout=out_dir / f"nail.{name}.log",
+        after=after,
+        inputs=inputs,
+        outputs=[
+            out_dir / f"nail.{name}.tsv",
+            out_dir / f"nail.{name}.out",
+            out_dir / f"nail.{name}.log",
+        ],
+        # the runs that share a prep directory never overlap
+        lock=prep,
+        group=group,
+    )
+
+
+def merge_nail(shards, dirs, name, results):
+    merge_tables(
+        [d / f"nail.{name}.tsv" for d in dirs],
+        sequence_scales(shards.manifest()),
+        NAIL_EVALUE,
+        results / f"nail.{name}.tsv",
+    )
+    concatenate([d / f"nail.{name}.out" for d in dirs],
+                results / f"nail.{name}.out")
+    merge_times([d / f"nail.{name}.time" for d in dirs],
+                results / f"nail.{name}.time")
+
+
+def nail_setup(paths, threads, shards=None):
+    # the setup and prep of the regular nail runs, which
+    # the sweep's runs share: (setup, prep jobs)
+    results = paths.results("nail")
+    prep = results / "prep/"
+
+    shard_dirs = [] if shards is None else shards.dirs(results)
+    setup = Job("nail setup",
+                action=lambda: make_dirs(results, prep, *shard_dirs))
+
+    if shards is None:
+        return (setup, [nail_prep(
+            paths.query_hmm, paths.target, prep, threads,
+            time=results / "nail.prep.time",
+            after=[setup],
+            label="nail prep",
+        )])
+
+    return (setup, [
+        nail_prep(
+            paths.query_hmm, target, out_dir / "prep/", threads,
+            time=out_dir / "nail.prep.time",
+            after=[setup, shards.split],
+            label=f"nail prep shard {k}",
+            group="nail prep shards",
+        )
+        for (k, target, out_dir) in shards.runs(results)
+    ])
+
+
+def nail_jobs(paths, threads, shards=None):
+    results = paths.results("nail")
+    prep = results / "prep/"
+
+    shard_dirs = [] if shards is None else shards.dirs(results)
+    (setup, preps) = nail_setup(paths, threads, shards)
+    jobs = [setup, *preps]
+
+    # the long sequence pairs are single-threaded and untimed, so
+    # they each get their own prep directory and can run side by side
+    long_seq = []
+    for (i, query, target) in paths.long_seq_pairs():
+        long_seq.append(Job(
+            f"nail long-seq {i}",
+            command=[
+                "nail", "search",
+                "-t", 1,
+                "-T", prep / f"long-seq-{i}.tsv",
+                "--prep", prep / f"long-seq-{i}/",
+                query,
+                target,
+            ],
+            after=[setup],
+            inputs=[query, target],
+            outputs=[prep / f"long-seq-{i}.tsv"],
+        ))
+
+    jobs += long_seq
+    jobs.append(Job(
+        "nail long-seq merge",
+        action=lambda: concatenate(
+            [prep / f"long-seq-{i}.tsv" for (i, _, _) in paths.long_seq_pairs()],
+            results / "long-seq.tsv",
+        ),
+        after=long_seq,
+        outputs=[results / "long-seq.tsv"],
+    ))
+
+    # the timed runs don't depend on each other: each
+    # is only rerun when something that goes into it changes
+    for (name, args) in NAIL_CONFIGS.items():
+        if shards is None:
+            jobs.append(nail_run(
+                paths, threads, name, args, paths.target, results,
+                after=preps,
+                inputs=[paths.query_hmm, paths.target],
+                label=f"nail {name}",
+            ))
+            continue
+
+        runs = []
+        for ((k, target, out_dir), prep_job) in zip(shards.runs(results), preps):
+            # the shard itself is covered by the split's key
+            runs.append(nail_run(
+                paths, threads, name, args, target, out_dir,
+                after=[prep_job],
+                inputs=[paths.query_hmm],
+                label=f"nail {name} shard {k}",
+                group=f"nail {name} shards",
+            ))
+
+        jobs += runs
+        jobs.append(Job(
+            f"nail {name} merge",
+            action=partial(merge_nail, shards, shard_dirs, name, results),
+            after=runs,
+            outputs=[
+                results / f"nail.{name}.tsv",
+                results / f"nail.{name}.out",
+                *merged_outputs(results / f"nail.{name}.time"),
+            ],
+        ))
+
+    return jobs
+
+
+def db_files(db):
+    # the parts of an mmseqs database that are always there
+    return [db.with_name(db.name + ".dbtype"), db.with_name(db.name + ".index")]
+
+
+# name -> extra `mmseqs search` arguments
+MMSEQS_CONFIGS = {
+    "default": [],
+    "sensitive": ["-s", 7.5, "--max-seqs", 1000],
+    "nail": [
+        "-k", K,
+        "--k-score", K_SCORE,
+        "--min-ungapped-score", MIN_UNGAPPED_SCORE,
+        "--max-seqs", MAX_SEQS,
+    ],
+}
+
+
+def mmseqs_target_db(target, target_db, out_dir, tmp_dir, threads, after,
+                     inputs, label, group=None):
+    # the target database and its precomputed k-mer index, which every
+    # search against it reads instead of indexing the targets itself
+    create_db = Job(
+        f"{label} createdb",
+        command=["mmseqs", "createdb", target, target_db],
+        threads=threads,
+        time=out_dir / "mmseqs.prep.createdb.time",
+        after=after,
+        inputs=inputs,
+        outputs=db_files(target_db),
+        group=None if group is None else f"{group} createdb",
+        repeat=False,
+    )
+    create_index = Job(
+        f"{label} createindex",
+        command=["mmseqs", "createindex", target_db, tmp_dir / "tmp-index/",
+                 "--threads", threads],
+        threads=threads,
+        time=out_dir / "mmseqs.prep.createindex.time",
+        after=[create_db],
+        outputs=db_files(target_db.with_name(target_db.name + ".idx")),
+        group=None if group is None else f"{group} createindex",
+        repeat=False,
+    )
+
+    return (create_db, create_index)
+
+
+def mmseqs_search(query_db, target_db, out_dir, prep, name, args, threads,
+                  after, label, time=None, stdout=None, group=None):
+    # the alignments and the tmp directory go in `prep`, as they always
+    # have; the time and log default to mmseqs.<name>.* in `out_dir`
+    align_db = prep / f"alignDb-{name}"
+    if time is None:
+        time = out_dir / f"mmseqs.{name}.time"
+    if stdout is None:
+        stdout = out_dir / f"mmseqs.{name}.log"
+
+    # every search gets its own tmp directory, so that
+    # they don't trip over each other if they overlap
+    search = Job(
+        label,
+        command=[
+            "mmseqs", "search", query_db, target_db, align_db,
+            prep / f"tmp-{name}/",
+            "--threads", threads,
+            *args,
+            "-e", E,
+        ],
+        threads=threads,
+        time=time,
+        stdout=stdout,
+        after=after,
+        outputs=[*db_files(align_db), stdout],
+        group=group,
+        report=MMSEQS_REPORT,
+    )
+
+    return (search, align_db)
+
+
+def mmseqs_convert(query_db, target_db, align_db, out, after, label):
+    return Job(
+        label,
+        command=[
+            "mmseqs", "convertalis", query_db, target_db, align_db, out,
+            "--format-output", "target,query,tstart,tend,qstart,qend,evalue",
+        ],
+        after=after,
+        outputs=[out],
+    )
+
+
+def merge_mmseqs(shards, dirs, name, results, unsorted):
+    # mmseqs' E-values scale with the number of residues in the database
+    merge_tables(
+        [d / f"mmseqs.{name}.tsv" for d in dirs],
+        residue_scales(shards.manifest()),
+        MMSEQS_EVALUE,
+        unsorted,
+    )
+    merge_times([d / f"mmseqs.{name}.time" for d in dirs],
+                results / f"mmseqs.{name}.time")
+
+
+def mmseqs_jobs(paths, threads, shards=None):
+    results = paths.results("mmseqs")
+    prep = results / "prep/"
+
+    target_db = prep / "targetDb"
+    msa_db = prep / "msaDb"
+    query_db = prep / "queryDb"
+
+    shard_dirs = [] if shards is None else shards.dirs(results)
+    setup = Job("mmseqs setup", action=lambda: make_dirs(
+        results, prep, *(d / "prep/" for d in shard_dirs)))
+
+    # the prep steps are timed on their own, into mmseqs.prep.<step>.time
+    convert_msa = Job(
+        "mmseqs convertmsa",
+        command=["mmseqs", "convertmsa", paths.query_msa, msa_db,
+                 "--identifier-field", 0],
+        threads=threads,
+        time=results / "mmseqs.prep.convertmsa.time",
+        after=[setup],
+        inputs=[paths.query_msa],
+        outputs=db_files(msa_db),
+        repeat=False,
+    )
+    msa_to_profile = Job(
+        "mmseqs msa2profile",
+        command=["mmseqs", "msa2profile", msa_db, query_db,
+                 "--match-mode", 1],
+        threads=threads,
+        time=results / "mmseqs.prep.msa2profile.time",
+        after=[convert_msa],
+        outputs=db_files(query_db),
+        repeat=False,
+    )
+
+    jobs = [setup, convert_msa, msa_to_profile]
+
+    if shards is None:
+        (create_db, create_index) = mmseqs_target_db(
+            paths.target, target_db, results, prep, threads,
+            after=[setup],
+            inputs=[paths.target],
+            label="mmseqs",
+        )
+        jobs += [create_db, create_index]
+    else:
+        shard_dbs = []
+        for (k, target, out_dir) in shards.runs(results):
+            shard_prep = out_dir / "prep/"
+            shard_db = shard_prep / "targetDb"
+            (create, index) = mmseqs_target_db(
+                target, shard_db, out_dir, shard_prep, threads,
+                after=[setup, shards.split],
+                inputs=[],
+                label=f"mmseqs shard {k}",
+                group="mmseqs shards",
+            )
+            shard_dbs.append((k, shard_db, out_dir, shard_prep, index))
+            jobs += [create, index]
+
+    for (name, args) in MMSEQS_CONFIGS.items():
+        unsorted = prep / f"mmseqs.{name}.unsorted.tsv"
+        out = results / f"mmseqs.{name}.tsv"
+
+        if shards is None:
+            (search, align_db) = mmseqs_search(
+                query_db, target_db, results, prep, name, args, threads,
+                after=[msa_to_profile, create_index],
+                label=f"mmseqs {name}",
+            )
+            convert = mmseqs_convert(
+                query_db, target_db, align_db, unsorted,
+                after=[search],
+                label=f"mmseqs {name} convertalis",
+            )
+            jobs += [search, convert]
+        else:
+            converts = []
+            for (k, shard_db, out_dir, shard_prep, index) in shard_dbs:
+                (search, align_db) = mmseqs_search(
+                    query_db, shard_db, out_dir, shard_prep, name, args,
+                    threads,
+                    after=[msa_to_profile, index],
+                    label=f"mmseqs {name} shard {k}",
+                    group=f"mmseqs {name} shards",
+                )
+                converts.append(mmseqs_convert(
+                    query_db, shard_db, align_db,
+                    out_dir / f"mmseqs.{name}.tsv",
+                    after=[search],
+                    label=f"mmseqs {name} shard {k} convertalis",
+                ))
+                jobs += [search, converts[-1]]
+
+            convert = Job(
+                f"mmseqs {name} merge",
+                action=partial(merge_mmseqs, shards, shard_dirs, name,
+                               results, unsorted),
+                after=converts,
+                outputs=[
+                    unsorted,
+                    *merged_outputs(results / f"mmseqs.{name}.time"),
+                ],
+            )
+            jobs.append(convert)
+
+        # plots.py relies on these being sorted by E-value
+        jobs.append(Job(
+            f"mmseqs {name} sort",
+            command=["sort", "-k7g", "-o", out, unsorted],
+            after=[convert],
+            outputs=[out],
+        ))
+
+    return jobs
+
+
+def hmmer_run(paths, threads, out_dir, target, after, inputs, label,
+              z=None, group=None):
+    # with -Z, the per-sequence E-values are computed for a database of
+    # that many sequences, rather than the number of sequences in
+    # `target`; the domain E-values use domZ, which merge_domtblout fixes
+    # up once every shard is done
+    return Job(
+        label,
+        command=[
+            "hmmsearch",
+            "--cpu", threads,
+            "-E", E,
+            *([] if z is None else ["-Z", z]),
+            "-o", out_dir / "hmmer.out",
+            "--notextw",
+            "--domtblout", out_dir / "hmmer.domtbl",
+            "--tblout", out_dir / "hmmer.tbl",
+            paths.query_hmm,
+            target,
+        ],
+        threads=threads,
+        time=out_dir / "hmmer.time",
+        after=after,
+        inputs=inputs,
+        outputs=[
+            out_dir / "hmmer.out",
+            out_dir / "hmmer.domtbl",
+            out_dir / "hmmer.tbl",
+        ],
+        group=group,
+    )
+
+
+def merge_hmmer(dirs, results):
+    merge_tblout([d / "hmmer.tbl" for d in dirs], results / "hmmer.tbl")
+    merge_domtblout([d / "hmmer.domtbl" for d in dirs],
+                    [d / "hmmer.tbl" for d in dirs],
+                    results / "hmmer.domtbl")
+
+    concatenate([d / "hmmer.out" for d in dirs], results / "hmmer.out")
+    merge_times([d / "hmmer.time" for d in dirs], results / "hmmer.time")
+
+
+def hmmer_jobs(paths, threads, shards=None):
+    results = paths.results("hmmer")
+
+    shard_dirs = [] if shards is None else shards.dirs(results)
+    setup = Job("hmmer setup", action=lambda: make_dirs(results, *shard_dirs))
+
+    if shards is None:
+        search = hmmer_run(paths, threads, results, paths.target,
+                           after=[setup],
+                           inputs=[paths.query_hmm, paths.target],
+                           label="hmmer")
+        return [setup, search]
+
+    runs = []
+    for (k, target, out_dir) in shards.runs(results):
+        runs.append(hmmer_run(paths, threads, out_dir, target,
+                              after=[setup, shards.split],
+                              inputs=[paths.query_hmm],
+                              label=f"hmmer shard {k}",
+                              z=shards.total_sequences,
+                              group="hmmer shards"))
+
+    merge = Job(
+        "hmmer merge",
+        action=partial(merge_hmmer, shard_dirs, results),
+        after=runs,
+        outputs=[
+            results / "hmmer.out",
+            results / "hmmer.domtbl",
+            results / "hmmer.tbl",
+            *merged_outputs(results / "hmmer.time"),
+        ],
+    )
+
+    return [setup, *runs, merge]
+
+
+def sweep_jobs(paths, threads, points):
+    # one timed nail run per point of a parameter sweep, where `points`
+    # maps each point's id to its parameters. They all reuse the prep
+    # directory of the regular nail runs.
+    results = paths.results("sweep") / "points/"
+    prep = paths.results("nail") / "prep/"
+
+    (nail, preps) = nail_setup(paths, threads)
+    setup = Job("sweep setup", action=lambda: make_dirs(results))
+    jobs = [nail, *preps, setup]
+
+    for (point_id, params) in points.items():
+        jobs.append(Job(
+            f"sweep {point_id}",
+            command=nail_search(
+                paths.query_hmm,
+                paths.target,
+                prep,
+                threads,
+                tsv=results / f"{point_id}.tsv",
+                params=params,
+            ),
+            threads=threads,
+            time=results / f"{point_id}.time",
+            stdout=results / f"{point_id}.log",
+            after=[setup, *preps],
+            inputs=[paths.query_hmm, paths.target],
+            outputs=[results / f"{point_id}.tsv", results / f"{point_id}.log"],
+            lock=prep,
+        ))
+
+    return jobs
+
+
+# the runs of the length-scaling suite: name -> (extra arguments,
+# whether it's hmmsearch rather than nail). hmmsearch only takes
+# profile queries, so it's skipped for pairs with sequence queries.
+SCALING_CONFIGS = {
+    "nail-sparse": ([], False),
+    "nail-full": (["--full-dp"], False),
+    "hmmer": ([], True),
+    "hmmer-max": (["--max"], True),
+}
+
+
+def scaling_jobs(paths, threads, pairs, configs=SCALING_CONFIGS):
+    # one timed run per (configuration, query/target pair); every pair
+    # gets its own nail prep directory, shared by its nail runs
+    results = paths.results("scaling")
+
+    setup = Job("scaling setup", action=lambda: make_dirs(
+        *(results / c for c in configs), results / "prep/"))
+    jobs = [setup]
+
+    for pair in pairs:
+        name = pair["name"]
+        query = Path(pair["query"])
+        target = Path(pair["target"])
+        prep = results / f"prep/{name}/"
+
+        # only built if there's a nail run on the pair
+        prep_job = nail_prep(query, target, prep, threads,
+                             time=results / f"prep/{name}.time",
+                             after=[setup],
+                             label=f"scaling prep {name}")
+        if any(not SCALING_CONFIGS[c][1] for c in configs):
+            jobs.append(prep_job)
+
+        for config in configs:
+            (args, hmmer) = SCALING_CONFIGS[config]
+            out_dir = results / config
+
+            if hmmer and not pair["hmm"]:
+                continue
+
+            if hmmer:
+                command = [
+                    "hmmsearch",
+                    "--cpu", threads,
+                    "-E", E,
+                    *args,
+                    "-o", "/dev/null",
+                    "--tblout", out_dir / f"{name}.tbl",
+                    query,
+                    target,
+                ]
+                outputs = [out_dir / f"{name}.tbl"]
+            else:
+                command = nail_search(query, target, prep, threads,
+                                      tsv=out_dir / f"{name}.tsv", args=args)
+                outputs = [out_dir / f"{name}.tsv"]
+
+            jobs.append(Job(
+                f"scaling {config} {name}",
+                command=command,
+                threads=threads,
+                time=out_dir / f"{name}.time",
+                after=[setup] if hmmer else [prep_job],
+                inputs=[query, target],
+                outputs=outputs,
+                lock=None if hmmer else prep,
+            ))
+
+    return jobs
+
+
+# the runs of the latency suite: name -> (tool, extra arguments), i.e.
+# every configuration of the regular runs, one query at a time
+LATENCY_CONFIGS = {
+    "hmmer": ("hmmer", []),
+    **{f"nail-{name}": ("nail", args) for (name, args) in NAIL_CONFIGS.items()},
+    **{f"mmseqs-{name}": ("mmseqs", args)
+       for (name, args) in MMSEQS_CONFIGS.items()},
+}
+
+
+def latency_jobs(paths, threads, queries, configs=LATENCY_CONFIGS):
+    # one timed run per (configuration, single-family query) against the
+    # whole target database. mmseqs searches the regular runs' target
+    # database and index, and every query gets its own nail prep
+    # directory; neither prep is part of a query's latency.
+    results = paths.results("latency")
+    query_dir = results / "queries/"
+    tools = {LATENCY_CONFIGS[c][0] for c in configs}
+
+    setup = Job("latency setup", action=lambda: make_dirs(
+        *(results / c for c in configs), query_dir, results / "prep/"))
+    jobs = [setup]
+
+    if "mmseqs" in tools:
+        mmseqs_results = paths.results("mmseqs")
+        mmseqs_prep = mmseqs_results / "prep/"
+        target_db = mmseqs_prep / "targetDb"
+
+        # the same jobs as the regular runs', so they're only run
+        # if those haven't been, or their target has changed
+        mmseqs_setup = Job("mmseqs setup",
+                           action=lambda: make_dirs(mmseqs_results, mmseqs_prep))
+        (create_db, create_index) = mmseqs_target_db(
+            paths.target, target_db, mmseqs_results, mmseqs_prep, threads,
+            after=[mmseqs_setup],
+            inputs=[paths.target],
+            label="mmseqs",
+        )
+        jobs += [mmseqs_setup, create_db, create_index]
+
+    for query in queries:
+        name = query["name"]
+        query_hmm = Path(query["hmm"])
+        query_msa = Path(query["msa"])
+        prep = results / f"prep/{name}/"
+
+        if "nail" in tools:
+            prep_job = nail_prep(query_hmm, paths.target, prep, threads,
+                                 time=results / f"prep/{name}.time",
+                                 after=[setup],
+                                 label=f"latency prep {name}")
+            jobs.append(prep_job)
+
+        if "mmseqs" in tools:
+            msa_db = query_dir / f"{name}.msaDb"
+            query_db = query_dir / f"{name}.queryDb"
+            convert_msa = Job(
+                f"latency convertmsa {name}",
+                command=["mmseqs", "convertmsa", query_msa, msa_db,
+                         "--identifier-field", 0],
+                after=[setup],
+                inputs=[query_msa],
+                outputs=db_files(msa_db),
+            )
+            msa_to_profile = Job(
+                f"latency msa2profile {name}",
+                command=["mmseqs", "msa2profile", msa_db, query_db,
+                         "--match-mode", 1],
+                after=[convert_msa],
+                outputs=db_files(query_db),
+            )
+            jobs += [convert_msa, msa_to_profile]
+
+        for config in configs:
+            (tool, args) = LATENCY_CONFIGS[config]
+            out_dir = results / config
+            time = out_dir / f"{name}.time"
+
+            if tool == "hmmer":
+                jobs.append(Job(
+                    f"latency {config} {name}",
+                    command=[
+                        "hmmsearch",
+                        "--cpu", threads,
+                        "-E", E,
+                        "-o", "/dev/null",
+                        "--tblout", out_dir / f"{name}.tbl",
+                        query_hmm,
+                        paths.target,
+                    ],
+                    threads=threads,
+                    time=time,
+                    after=[setup],
+                    inputs=[query_hmm, paths.target],
+                    outputs=[out_dir / f"{name}.tbl"],
+                ))
+            elif tool == "nail":
+                jobs.append(Job(
+                    f"latency {config} {name}",
+                    command=nail_search(query_hmm, paths.target, prep, threads,
+                                        tsv=out_dir / f"{name}.tsv", args=args),
+                    threads=threads,
+                    time=time,
+                    after=[prep_job],
+                    inputs=[query_hmm, paths.target],
+                    outputs=[out_dir / f"{name}.tsv"],
+                    lock=prep,
+                ))
+            else:
+                # the hits aren't scored, so the alignments are never
+                # converted; the search's own output is all there is
+                (search, _) = mmseqs_search(
+                    query_db, target_db, out_dir, out_dir, name, args, threads,
+                    after=[msa_to_profile, create_index],
+                    label=f"latency {config} {name}",
+                    time=time,
+                    stdout=out_dir / f"{name}.log",
+                )
+                jobs.append(search)
+
+    return jobs
+
+
+def benchmark_jobs(paths, threads, tools=TOOLS, shards=None):
+    builders = {
+        "nail": nail_jobs,
+        "mmseqs": mmseqs_jobs,
+        "hmmer": hmmer_jobs,
+    }
+
+    jobs = []
+    if shards is not None:
+        jobs.append(shards.split)
+
+    for tool in tools:
+        jobs += builders[tool](paths, threads, shards)
+
+    return jobs
+
+
+def dbsize_jobs(subsets, threads, tools=TOOLS):
+    # the regular runs, once per (label, paths) subset of the target
+    # database; the jobs are named after their subset, so that each
+    # one's record of finished runs is its own
+    jobs = []
+    for (label, paths) in subsets:
+        for job in benchmark_jobs(paths, threads, tools):
+            job.name = f"dbsize {label} {job.name}"
+            jobs.append(job)
+
+    return jobs
+
+
+def report_lines(job):
+    if not job.report or job.stdout is None or not Path(job.stdout).exists():
+        return []
+
+    pattern = re.compile("|".join(re.escape(r) for r in job.report))
+    with open(job.stdout) as file:
+        return [line.rstrip("\n") for line in file if pattern.search(line)]
@@ -0,0 +1,175 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from hits import expand
+
+JOINS = ["inner", "left", "anti"]
+
+
+class Join:
+    # pairs of row indices into the left and right tables; in a left
+    # join, the right index is -1 for left rows that had no match
+    def __init__(self, left, right, left_index, right_index):
+        self.left = left
+        self.right = right
+        self.left_index = left_index
+        self.right_index = right_index
+
+    def __len__(self):
+        return len(self.left_index)
+
+    def matched(self):
+        return self.right_index >= 0
+
+    def left_rows(self):
+        return self.left.take(self.left_index)
+
+    def right_rows(self):
+        # only defined for the rows that have a match
+        return self.right.take(self.right_index[self.matched()])
+
+    def right_column(self, name, fill=np.nan):
+        column = getattr(self.right, name)
+        values = np.full(len(self), fill, dtype=np.result_type(column, fill))
+        matched = self.matched()
+        values[matched] = column[self.right_index[matched]]
+        return values
+
+
+def join(left, right, how="inner", overlap=False):
+    # join two hit tables on (query, target), and optionally also require
+    # that the two hits overlap on the target; the tables can come from
+    # different files, so their names are first re-encoded against a
+    # shared vocabulary and the joins are sort-merge joins on integer keys
+    if how not in JOINS:
+        raise ValueError(f"unknown join: {how}")
+
+    (left_keys, right_keys) = pair_keys(left, right)
+    (left_index, right_index) = merge(left_keys, right_keys)
+
+    if overlap:
+        keep = (
+            np.maximum(left.target_start[left_index],
+                       right.target_start[right_index])
+            <= np.minimum(left.target_end[left_index],
+                          right.target_end[right_index])
+        )
+        left_index = left_index[keep]
+        right_index = right_index[keep]
+
+    if how == "inner":
+        return Join(left, right, left_index, right_index)
+
+    unmatched = np.ones(len(left), dtype=bool)
+    unmatched[left_index] = False
+    unmatched_index = np.flatnonzero(unmatched)
+
+    if how == "anti":
+        return Join(
+            left,
+            right,
+            unmatched_index,
+            np.full(len(unmatched_index), -1, dtype=np.int64),
+        )
+
+    left_index = np.concatenate([left_index, unmatched_index])
+    right_index = np.concatenate([
+        right_index,
+        np.full(len(unmatched_index), -1, dtype=np.int64),
+    ])
+
+    # keep the left table's row order
+    order = np.argsort(left_index, kind="stable")
+
+    return Join(left, right, left_index[order], right_index[order])
+
+
+def shared_codes(left_names, right_names):
+    (names, inverse) = np.unique(
+        np.concatenate([left_names, right_names]), return_inverse=True)
+
+    return (len(names), inverse[:len(left_names)], inverse[len(left_names):])
+
+
+def pair_keys(left, right):
+    (_, left_query, right_query) = shared_codes(
+        left.query_names, right.query_names)
+    (num_targets, left_target, right_target) = shared_codes(
+        left.target_names, right.target_names)
+
+    left_keys = (left_query[left.query].astype(np.int64) * num_targets
+                 + left_target[left.target])
+    right_keys = (right_query[right.query].astype(np.int64) * num_targets
+                  + right_target[right.target])
+
+    return (left_keys, right_keys)
+
+
+def merge(left_keys, right_keys):
+    # every (left, right) pair of rows with equal keys, in left order
+    order = np.argsort(right_keys, kind="stable")
+    sorted_keys = right_keys[order]
+
+    lo = np.searchsorted(sorted_keys, left_keys, side="left")
+    hi = np.searchsorted(sorted_keys, left_keys, side="right")
+    counts = hi - lo
+
+    (left_index, position) = expand(lo, counts)
+    right_index = order[position]
+
+    return (left_index, right_index)
+
+
+def find_hits(hits, name):
+    for h in hits:
+        if h.name == name:
+            return h
+
+    names = ", ".join(sorted(h.name for h in hits))
+    raise SystemExit(f"no results named '{name}' (have: {names})")
+
+
+if __name__ == "__main__":
+    from plots import read_hmmer_results, read_mmseqs_results, read_nail_results
+
+    parser = argparse.ArgumentParser(
+        description="join the hits of two result sets on (query, target), "
+        "e.g. to list what nail found that hmmer missed")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("left", help="e.g. 'nail default'")
+    parser.add_argument("right", help="e.g. 'hmmer'")
+    parser.add_argument("--how", choices=JOINS, default="anti")
+    parser.add_argument("--overlap", action="store_true",
+                        help="also require the hits to overlap on the target")
+    parser.add_argument("--all", action="store_true",
+                        help="join all hits, not just the true positives")
+    args = parser.parse_args()
+
+    results_dir = args.benchmark_dir / "results/"
+    hits = (
+        read_hmmer_results(results_dir)
+        + read_nail_results(results_dir)
+        + read_mmseqs_results(results_dir)
+    )
+
+    left = find_hits(hits, args.left)
+    right = find_hits(hits, args.right)
+
+    if args.all:
+        (left, right) = (left.table, right.table)
+    else:
+        (left, right) = (left.true_positives, right.true_positives)
+
+    joined = join(left, right, how=args.how, overlap=args.overlap)
+
+    rows = joined.left_rows()
+    right_evalue = joined.right_column("evalue")
+
+    out = sys.stdout
+    out.write(f"# query\ttarget\t{args.left} evalue\t{args.right} evalue\n")
+    for (q, t, e, r) in zip(rows.query_name, rows.target_name,
+                            rows.evalue, right_evalue):
+        out.write(f"{q}\t{t}\t{e:.3g}\t{r:.3g}\n")
@@ -0,0 +1,163 @@
+#! /usr/bin/env python3
+
+# measures the latency of single-family searches, i.e. how long one query
+# takes against the whole target database, rather than the batch runtime
+# over all of the queries:
+#
+#     latency.py <benchmark-dir> [--queries 100] [--seed 0]
+#
+# a seeded sample of the benchmark's families is searched one at a time by
+# every configuration of the regular runs (as an HMM for hmmsearch and
+# nail, and as an MSA for mmseqs). Each search is timed on its own, and the
+# per-query wall times go to results/latency/latency.tsv, with each
+# configuration's p50, p95 and p99 in results/latency/percentiles.tsv.
+# plots.py draws them against model length in latency.pdf.
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from jobs import LATENCY_CONFIGS, Paths, latency_jobs
+from orchestrate import Scheduler
+from runstate import RunState, read_json, write_json
+from scaling import hmm_models
+from stoindex import stockholm_index
+
+LATENCY_QUERIES = 100
+LATENCY_PERCENTILES = [50, 95, 99]
+
+
+def choose_queries(paths, count, seed):
+    # (name, length, text) of `count` models chosen at random, out of
+    # those that also have a training alignment
+    families = {n.decode() for n in stockholm_index(paths.query_msa).names}
+    models = [m for m in hmm_models(paths.query_hmm) if m[0] in families]
+
+    if count >= len(models):
+        return models
+
+    chosen = set(random.Random(seed).sample([n for (n, _, _) in models], count))
+    return [m for m in models if m[0] in chosen]
+
+
+def write_queries(paths, count, seed, queries_dir):
+    queries_dir.mkdir(parents=True, exist_ok=True)
+    index = stockholm_index(paths.query_msa)
+
+    queries = []
+    for (name, length, text) in choose_queries(paths, count, seed):
+        hmm = queries_dir / f"{name}.hmm"
+        with open(hmm, "w") as file:
+            file.write(text)
+
+        msa = queries_dir / f"{name}.sto"
+        with open(msa, "wb") as file:
+            index.fetch([name], file)
+
+        queries.append({
+            "name": name,
+            "hmm": str(hmm),
+            "msa": str(msa),
+            "length": length,
+        })
+
+    return queries
+
+
+def read_latency(latency_dir):
+    # config -> (query names, model lengths, seconds), over every
+    # finished search
+    queries = read_json(latency_dir / "queries.json") or []
+
+    runs = {}
+    for config in LATENCY_CONFIGS:
+        points = []
+        for query in queries:
+            record = read_json(latency_dir / f"{config}/{query['name']}.rusage.json")
+            if record is None or record["exit_code"] != 0:
+                continue
+            points.append((query["name"], query["length"], record["real"]))
+
+        if points:
+            (names, lengths, seconds) = zip(*points)
+            runs[config] = (list(names), np.array(lengths, dtype=np.float64),
+                            np.array(seconds, dtype=np.float64))
+
+    return runs
+
+
+def latency_percentiles(runs):
+    # config -> (searches, [p50, p95, p99], max)
+    return {
+        config: (len(seconds),
+                 [float(v) for v in np.percentile(seconds, LATENCY_PERCENTILES)],
+                 float(seconds.max()))
+        for (config, (_, _, seconds)) in runs.items()
+    }
+
+
+def write_latency(runs, latency_dir):
+    with open(latency_dir / "latency.tsv", "w") as file:
+        file.write("config\tquery\tlength\tseconds\n")
+        for (config, columns) in runs.items():
+            for (name, length, seconds) in zip(*columns):
+                file.write(f"{config}\t{name}\t{length:.0f}\t{seconds:.3f}\n")
+
+    with open(latency_dir / "percentiles.tsv", "w") as file:
+        file.write("config\tsearches\t"
+                   + "".join(f"p{p}\t" for p in LATENCY_PERCENTILES)
+                   + "max\n")
+        for (config, (n, values, top)) in latency_percentiles(runs).items():
+            file.write(f"{config}\t{n}\t"
+                       + "".join(f"{v:.3f}\t" for v in values)
+                       + f"{top:.3f}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="measure the per-query latency of single-family searches "
+        "against the whole target database")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("--queries", type=int, default=LATENCY_QUERIES,
+                        help="how many families to search with "
+                        f"(default: {LATENCY_QUERIES})")
+    parser.add_argument("--configs", nargs="+", choices=list(LATENCY_CONFIGS),
+                        default=list(LATENCY_CONFIGS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-t", "--threads", type=int, default=1)
+    parser.add_argument("--cores", type=int, default=os.cpu_count())
+    parser.add_argument("--results-dir", type=Path)
+    parser.add_argument("--report", action="store_true",
+                        help="only summarize the finished searches")
+    args = parser.parse_args()
+
+    paths = Paths(args.benchmark_dir, args.results_dir)
+    latency_dir = paths.results("latency")
+
+    if not args.report:
+        queries = write_queries(paths, args.queries, args.seed,
+                                latency_dir / "queries/")
+        write_json(latency_dir / "queries.json", queries)
+
+        # a query's latency is only its own if it has the machine to itself
+        scheduler = Scheduler(args.cores, exclusive_timed=True,
+                              state=RunState(paths.results_root / ".runs/"))
+        failed = asyncio.run(scheduler.run(
+            latency_jobs(paths, args.threads, queries, args.configs)))
+
+        if failed:
+            print(f"failed: {', '.join(j.name for j in failed)}")
+
+    runs = read_latency(latency_dir)
+    if not runs:
+        sys.exit("no finished searches")
+
+    write_latency(runs, latency_dir)
+
+    with open(latency_dir / "percentiles.tsv") as file:
+        print(file.read(), end="")
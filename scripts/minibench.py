@@ -0,0 +1,252 @@
+#! /usr/bin/env python3
+
+# builds a down-scaled copy of a benchmark, for smoke runs that finish in
+# minutes rather than hours:
+#
+#     minibench.py benchmark/ benchmark-mini/ [--fraction 0.05] [--seed 0]
+#
+# the families are sampled, by seed, from strata of model length x number
+# of test positives, so the mini benchmark keeps the full one's mix of
+# short and long, rare and common families. Every positive of a chosen
+# family is kept, and decoys are sampled so that the ratio of positives to
+# decoys stays the same. The result has the usual .pos, .test.fa,
+# .train.msa and .train.hmm layout, so run-all.sh and plots.py work on it
+# as they are.
+#
+# once both benchmarks have been run,
+#
+#     minibench.py benchmark/ benchmark-mini/ --report
+#
+# compares their recall and their runtimes relative to hmmsearch.
+
+import argparse
+import json
+import mmap
+import os
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from hitcache import HitCache
+from ingest import default_workers
+from plots import (Benchmark, metrics, read_hmmer_results, read_mmseqs_results,
+                   read_nail_results, read_times)
+from scaling import hmm_models
+from seqindex import FASTA_HEADER
+from shards import fasta_records
+from stoindex import stockholm_index
+
+# the run that the other runs' runtimes are compared to
+REFERENCE_RUN = "hmmer"
+
+
+def strata(values, bins):
+    # the quantile bin of each value
+    values = np.asarray(values, dtype=np.float64)
+    edges = np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1])
+    return np.searchsorted(edges, values, side="right")
+
+
+def choose_families(families, lengths, positives, fraction, bins, seed):
+    # a stratified sample of `fraction` of the families. The strata are the
+    # cells of a bins x bins grid over model length and positive count, and
+    # each gets its share of the sample, with the remainders going to the
+    # strata with the largest fractional shares
+    cells = {}
+    for (family, a, b) in zip(families,
+                              strata(lengths, bins), strata(positives, bins)):
+        cells.setdefault((int(a), int(b)), []).append(family)
+
+    total = max(1, round(fraction * len(families)))
+    shares = {cell: fraction * len(members) for (cell, members) in cells.items()}
+    counts = {cell: int(share) for (cell, share) in shares.items()}
+    by_remainder = sorted(cells, key=lambda c: (counts[c] - shares[c], c))
+    for cell in by_remainder[:total - sum(counts.values())]:
+        counts[cell] += 1
+
+    rng = random.Random(seed)
+    chosen = set()
+    for cell in sorted(cells):
+        chosen.update(rng.sample(sorted(cells[cell]), counts[cell]))
+
+    return chosen
+
+
+def family_name(label):
+    return label.split("/")[0]
+
+
+def build(full_dir, mini_dir, fraction, bins, seed):
+    full_name = full_dir.name
+    mini_name = mini_dir.name
+    mini_dir.mkdir(parents=True, exist_ok=True)
+
+    def full(suffix):
+        return full_dir / f"{full_name}.{suffix}"
+
+    def mini(suffix):
+        return mini_dir / f"{mini_name}.{suffix}"
+
+    models = [(name, length) for (name, length, _) in
+              hmm_models(full("train.hmm"))]
+
+    with open(full("pos")) as file:
+        pos_lines = file.readlines()
+
+    positives = {}
+    for line in pos_lines:
+        family = family_name(line.split()[0])
+        positives[family] = positives.get(family, 0) + 1
+
+    families = [name for (name, _) in models]
+    chosen = choose_families(
+        families,
+        [length for (_, length) in models],
+        [positives.get(name, 0) for name in families],
+        fraction,
+        bins,
+        seed,
+    )
+
+    # the positives of the chosen families, in the full benchmark's order
+    kept_pos = [line for line in pos_lines
+                if family_name(line.split()[0]) in chosen]
+    with open(mini("pos"), "w") as file:
+        file.writelines(kept_pos)
+
+    # the models and alignments of the chosen families, in file order
+    with open(mini("train.hmm"), "w") as file:
+        for (name, _, text) in hmm_models(full("train.hmm")):
+            if name in chosen:
+                file.write(text)
+
+    if full("train.msa").exists():
+        index = stockholm_index(full("train.msa"))
+        names = [n.decode() for n in index.names if n.decode() in chosen]
+        with open(mini("train.msa"), "wb") as file:
+            index.fetch(names, file)
+
+    # the chosen families' positives, and decoys sampled in proportion,
+    # sliced straight out of the full target database
+    positive_labels = {line.split()[0] for line in kept_pos}
+    with open(full("test.fa"), "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            records = fasta_records(mm)
+            names = [m.group(1).decode() for m in FASTA_HEADER.finditer(mm)]
+
+            decoys = [i for (i, n) in enumerate(names)
+                      if family_name(n) not in positives]
+            keep_decoys = round(len(decoys) * len(kept_pos) / max(len(pos_lines), 1))
+            kept_decoys = set(random.Random(seed).sample(decoys, keep_decoys))
+
+            with open(mini("test.fa"), "wb") as out:
+                for (i, ((start, end, _), name)) in enumerate(zip(records, names)):
+                    if name in positive_labels or i in kept_decoys:
+                        out.write(mm[start:end])
+
+    long_seq = full_dir / "long-seq"
+    if long_seq.exists() and not (mini_dir / "long-seq").exists():
+        os.symlink(long_seq.resolve(), mini_dir / "long-seq")
+
+    manifest = {
+        "source": str(full_dir.resolve()),
+        "seed": seed,
+        "fraction": fraction,
+        "strata": bins,
+        "families": sorted(chosen),
+        "positives": len(kept_pos),
+        "decoys": keep_decoys,
+    }
+    with open(mini_dir / "minibench.json", "w") as file:
+        json.dump(manifest, file, indent=2)
+
+    print(f"{len(chosen)} of {len(families)} families, {len(kept_pos)} "
+          f"positives and {keep_decoys} decoys")
+
+
+def benchmark_metrics(benchmark_dir, workers):
+    benchmark = Benchmark(benchmark_dir)
+    results_dir = benchmark_dir / "results/"
+    cache = HitCache(results_dir / ".cache")
+
+    hits = (
+        read_hmmer_results(results_dir, cache, workers)
+        + read_nail_results(results_dir, cache, workers)
+        + read_mmseqs_results(results_dir, cache, workers)
+    )
+
+    return metrics(hits, read_times(results_dir),
+                   benchmark.num_true_positives, benchmark.num_queries)
+
+
+def compare(full, mini):
+    # run -> (full recall, mini recall, full runtime ratio, mini runtime
+    # ratio), where the ratios are to the reference run's runtime
+    def ratio(runs, name):
+        if "runtime" not in runs[name] or "runtime" not in runs.get(REFERENCE_RUN, {}):
+            return float("nan")
+        return runs[name]["runtime"] / runs[REFERENCE_RUN]["runtime"]
+
+    rows = {}
+    for name in full:
+        if name not in mini:
+            continue
+
+        rows[name] = (
+            full[name]["recall_before_first_false_positive"],
+            mini[name]["recall_before_first_false_positive"],
+            ratio(full, name),
+            ratio(mini, name),
+        )
+
+    return rows
+
+
+def write_report(rows, path):
+    with open(path, "w") as file:
+        file.write("run\trecall_full\trecall_mini\trecall_diff\t"
+                   f"runtime_vs_{REFERENCE_RUN}_full\t"
+                   f"runtime_vs_{REFERENCE_RUN}_mini\truntime_ratio_error\n")
+        for (name, (rf, rm, tf, tm)) in rows.items():
+            file.write(f"{name}\t{rf:.4f}\t{rm:.4f}\t{rm - rf:+.4f}\t"
+                       f"{tf:.3f}\t{tm:.3f}\t{tm / tf - 1:+.1%}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="build a stratified, down-scaled copy of a benchmark, "
+        "or compare the results of the two")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("mini_dir", type=Path)
+    parser.add_argument("--fraction", type=float, default=0.05,
+                        help="the fraction of families to keep (default: 0.05)")
+    parser.add_argument("--strata", type=int, default=4,
+                        help="quantile bins of model length and of positive "
+                        "count to stratify by (default: 4)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=default_workers(),
+                        help="number of processes used to parse result files")
+    parser.add_argument("--report", action="store_true",
+                        help="compare the recall and relative runtimes of the "
+                        "two benchmarks' results")
+    args = parser.parse_args()
+
+    if not args.report:
+        if not 0 < args.fraction <= 1:
+            parser.error("--fraction must be in (0, 1]")
+
+        build(args.benchmark_dir, args.mini_dir, args.fraction, args.strata,
+              args.seed)
+        sys.exit()
+
+    rows = compare(benchmark_metrics(args.benchmark_dir, args.workers),
+                   benchmark_metrics(args.mini_dir, args.workers))
+    if not rows:
+        sys.exit("no runs in common")
+
+    write_report(rows, args.mini_dir / "minibench.tsv")
+
+    with open(args.mini_dir / "minibench.tsv") as file:
+        print(file.read(), end="")
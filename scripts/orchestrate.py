@@ -0,0 +1,336 @@
+#! /usr/bin/env python3
+
+# runs the benchmark's jobs side by side, within a budget of cores:
+#
+#     orchestrate.py <benchmark-dir> [-t threads] [--cores N]
+#
+# every job declares how many threads it uses, and a job only starts
+# once its dependencies are done and enough of the budget is free.
+# Timed runs get the machine to themselves, so that their runtimes are
+# comparable, unless --overlap-timed lets other jobs run alongside them.
+# The shards of one search (--shards) share the machine with each other.
+#
+# finished jobs are remembered in <results-dir>/.runs/, and only the
+# jobs whose inputs, parameters or tool version changed since, or that
+# were interrupted, are run again; --rerun ignores what's there.
+#
+# with --trials K, every timed job is run K times (with --cold, from an
+# empty page cache each time), and its .time is the median trial's. The
+# one-off prep steps (nail prep, mmseqs createdb, ...) are timed once.
+#
+# with --sample <seconds>, timed jobs also record a resource timeline
+# (see timeline.py) next to their .time.
+
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from jobs import TOOLS, Paths, Shards, benchmark_jobs, report_lines, rusage_path
+from runstate import RunState
+from timed import evict
+from timeline import timeline_path
+
+TIMED = Path(__file__).resolve().parent / "timed.py"
+
+
+class Scheduler:
+    def __init__(self, cores, exclusive_timed=False, state=None):
+        self.cores = cores
+        self.exclusive_timed = exclusive_timed
+        self.state = state
+        self.keys = {}
+
+    def cost(self, job):
+        # a job that wants more than the whole budget runs on its own
+        return max(1, min(job.threads, self.cores))
+
+    def exclusive(self, job):
+        return self.exclusive_timed and job.timed()
+
+    async def run(self, jobs):
+        # returns the jobs that failed, or were skipped because one
+        # of the jobs they depend on failed
+        pending = list(jobs)
+        running = {}
+        done = set()
+        failed = []
+
+        if self.state is not None:
+            for job in jobs:
+                if self.resume(job):
+                    pending.remove(job)
+                    done.add(job)
+
+        while pending or running:
+            free = self.cores - sum(self.cost(j) for j in running.values())
+            # the groups of the exclusive jobs that are running, where
+            # None is a job that has the machine to itself
+            owners = {j.group for j in running.values() if self.exclusive(j)}
+            locks = {j.lock for j in running.values() if j.lock is not None}
+
+            for job in list(pending):
+                if any(d in failed for d in job.after):
+                    print(f"skipping {job.name}")
+                    pending.remove(job)
+                    failed.append(job)
+                    continue
+
+                if not all(d in done for d in job.after):
+                    continue
+
+                if owners and (None in owners or not self.exclusive(job)
+                               or job.group not in owners):
+                    # only the rest of the running group may join it
+                    continue
+
+                if job.lock is not None and job.lock in locks:
+                    continue
+
+                if self.exclusive(job) and not owners:
+                    # nothing gets ahead of an exclusive job, or it might
+                    # never find the machine idle
+                    if running:
+                        break
+                    owners.add(job.group)
+                elif self.cost(job) > free:
+                    continue
+
+                pending.remove(job)
+                free -= self.cost(job)
+                locks.add(job.lock)
+                running[asyncio.create_task(self.launch(job))] = job
+
+            if not running:
+                if pending:
+                    # only a dependency that was never scheduled gets here
+                    names = ", ".join(j.name for j in pending)
+                    raise RuntimeError(f"jobs can never run: {names}")
+                continue
+
+            (finished, _) = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in finished:
+                job = running.pop(task)
+                if task.result():
+                    done.add(job)
+                else:
+                    failed.append(job)
+
+        return failed
+
+    def resume(self, job):
+        # whether a job is already done; jobs are keyed in order,
+        # so the keys of the jobs it depends on are already known
+        key = self.state.key(job, [self.keys[d] for d in job.after])
+        self.keys[job] = key
+
+        if not job.outputs:
+            return False
+
+        status = self.state.status(job, key)
+        if status == "done":
+            print(f"{job.name} is up to date")
+            return True
+
+        if status == "interrupted":
+            print(f"{job.name} was interrupted, running it again")
+
+        return False
+
+    async def launch(self, job):
+        if self.state is None or not job.outputs:
+            return await execute(job)
+
+        key = self.keys[job]
+        self.state.start(job, key)
+        ok = await execute(job)
+
+        missing = [str(p) for p in job.outputs if not Path(p).exists()]
+        if ok and missing:
+            print(f"{job.name}: didn't write {', '.join(missing)}")
+            ok = False
+
+        self.state.finish(job, key, ok)
+
+        return ok
+
+
+async def execute(job):
+    # returns whether the job succeeded
+    print(f"running {job.name}...")
+    start = time.monotonic()
+
+    if job.action is not None:
+        try:
+            await asyncio.to_thread(job.action)
+        except Exception as e:
+            print(f"{job.name}: {e}")
+            return False
+        return True
+
+    if job.timed() and job.repeated():
+        return await execute_trials(job)
+
+    if not await run_command(job, job.time):
+        return False
+
+    if job.timed():
+        print(f"{job.name} time: {read_real(job.time):.2f}")
+    else:
+        print(f"{job.name} done ({time.monotonic() - start:.2f}s)")
+
+    for line in report_lines(job):
+        print(f"{job.name}: {line}")
+
+    return True
+
+
+async def execute_trials(job):
+    trial_times = job.trial_times()
+    trial_times[0].parent.mkdir(parents=True, exist_ok=True)
+
+    for (i, trial_time) in enumerate(trial_times):
+        if job.cold:
+            evict(cold_files(job))
+
+        if not await run_command(job, trial_time):
+            return False
+
+        print(f"{job.name} trial {i + 1}/{job.trials} time: "
+              f"{read_real(trial_time):.2f}")
+
+    # the job's own record is the median trial's (the lower
+    # one of the two middle trials, for an even number)
+    order = sorted(trial_times, key=read_real)
+    median = order[(len(order) - 1) // 2]
+
+    shutil.copyfile(median, job.time)
+    shutil.copyfile(rusage_path(median), rusage_path(job.time))
+    if job.sample is not None:
+        shutil.copyfile(timeline_path(median), timeline_path(job.time))
+
+    print(f"{job.name} median time: {read_real(job.time):.2f}")
+
+    for line in report_lines(job):
+        print(f"{job.name}: {line}")
+
+    return True
+
+
+async def run_command(job, time_path=None):
+    command = [str(c) for c in job.command]
+    if time_path is not None:
+        sample = [] if job.sample is None else ["--sample", str(job.sample)]
+        command = [sys.executable, str(TIMED), "-o", str(time_path), *sample,
+                   *command]
+
+    stdout = open(job.stdout, "w") if job.stdout else subprocess.DEVNULL
+    try:
+        process = await asyncio.create_subprocess_exec(*command, stdout=stdout)
+        code = await process.wait()
+    except OSError as e:
+        print(f"{job.name}: cannot run {command[0]}: {e.strerror}")
+        return False
+    finally:
+        if job.stdout:
+            stdout.close()
+
+    if code != 0:
+        print(f"{job.name}: exited with code {code}")
+        return False
+
+    return True
+
+
+def read_real(time_path):
+    with open(time_path) as file:
+        return float(file.readline().split()[1])
+
+
+def cold_files(job):
+    # everything the job's command refers to that's on disk: files,
+    # directories (e.g. nail's prep directory) and mmseqs databases,
+    # which are a prefix shared by several files
+    files = set()
+    for arg in [*job.inputs, *job.command]:
+        if not isinstance(arg, Path):
+            continue
+
+        if arg.is_dir():
+            files.update(p for p in arg.rglob("*") if p.is_file())
+        elif arg.parent.is_dir():
+            files.update(p for p in arg.parent.glob(arg.name + "*")
+                         if p.is_file())
+
+    return sorted(files)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="run the benchmark's tools within a budget of cores")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("-t", "--threads", type=int, default=1,
+                        help="threads for each tool run (default: 1)")
+    parser.add_argument("--cores", type=int, default=os.cpu_count(),
+                        help="how many cores the jobs may use at once "
+                        "(default: all of them)")
+    parser.add_argument("--overlap-timed", dest="exclusive_timed",
+                        action="store_false",
+                        help="let other jobs run alongside the timed runs, "
+                        "which is faster but skews their runtimes")
+    # the default, kept so that existing ORCHESTRATE_ARGS still work
+    parser.add_argument("--exclusive-timed", dest="exclusive_timed",
+                        action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--results-dir", type=Path,
+                        help="where to write the results "
+                        "(default: <benchmark-dir>/results/)")
+    parser.add_argument("--tools", nargs="+", choices=TOOLS, default=TOOLS)
+    parser.add_argument("--shards", type=int,
+                        help="split the target database into this many "
+                        "shards, search each as its own job and merge the "
+                        "results")
+    parser.add_argument("--trials", type=int, default=1,
+                        help="run every timed job this many times; its .time "
+                        "is the median trial's, and every trial is kept in "
+                        "trials/ next to it")
+    parser.add_argument("--cold", action="store_true",
+                        help="drop the files each timed run reads from the "
+                        "page cache before every trial")
+    parser.add_argument("--sample", type=float, metavar="SECONDS",
+                        help="sample each timed run's processes this often, "
+                        "into a .timeline.tsv next to its .time")
+    parser.add_argument("--rerun", action="store_true",
+                        help="run every job, even those that are up to date")
+    args = parser.parse_args()
+
+    if args.shards is not None and args.shards < 1:
+        parser.error("--shards must be at least 1")
+
+    paths = Paths(args.benchmark_dir, args.results_dir)
+    shards = None if args.shards is None else Shards(paths, args.shards)
+    jobs = benchmark_jobs(paths, args.threads, args.tools, shards)
+
+    if args.trials < 1:
+        parser.error("--trials must be at least 1")
+
+    for job in jobs:
+        if job.timed():
+            if job.repeat:
+                job.set_trials(args.trials, args.cold)
+            if args.sample is not None:
+                job.set_sample(args.sample)
+
+    state = RunState(paths.results_root / ".runs/", args.rerun)
+
+    scheduler = Scheduler(args.cores, args.exclusive_timed, state)
+    failed = asyncio.run(scheduler.run(jobs))
+
+    if failed:
+        names = ", ".join(j.name for j in failed)
+        sys.exit(f"failed: {names}")
@@ -1,13 +1,22 @@
 # /bin/python3
 
+import argparse
+import json
 import math
-import subprocess
 import sys
+from functools import cached_property
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 
+from hitcache import HitCache
+from hits import Cols
+from ingest import default_workers, read_results
+from join import join
+from seqindex import fasta_lengths, hmm_lengths
+from stream import stream_results
+from timeline import plot_timeline
+
 colors = [
     "#D81B60",  # red
     "#1E88E5",  # blue
@@ -17,13 +26,57 @@ colors = [
 
 figsize = (10, 7)
 
+# the recall figure only shows the curves up to this many
+# mean false positives per search
+max_mean_false = 1e1
+
+# how the spread of repeated trials is shown on the resource figures
+INTERVALS = ["iqr", "bootstrap"]
+BOOTSTRAP_SAMPLES = 1000
+
+# the figures that can be asked for with --figures:
+#   roc: roc.pdf
+#   time: runtime.pdf, cpu.pdf and memory.pdf
+#   bitscore: bitscore.pdf
+#   cells: cells.png
+#   threads: speedup.pdf and efficiency.pdf, from run-threads.sh
+#   scaling: scaling-time.pdf and scaling-memory.pdf, from scaling.py
+#   timelines: <name>.timeline.pdf next to each run's .time, from
+#     orchestrate.py --sample
+#   prep: amortized.pdf, the runtime per search with each tool's prep
+#     spread over more and more searches
+#   latency: latency.pdf, single-query wall time against model length,
+#     from latency.py
+#   dbsize: dbsize-time.pdf and dbsize-throughput.pdf, from dbsize.py
+FIGURES = ["roc", "time", "bitscore", "cells", "threads", "scaling",
+           "timelines", "prep", "latency", "dbsize"]
+
+# the numbers of searches that the prep figure spreads the prep time over
+AMORTIZE_SEARCHES = (1, 1000)
+
+# with --dense, the recall curves are cut down to the first and last point
+# in each of this many log-spaced bins of mean false positives, and the
+# scatter figures are drawn as hexbin densities of this many hexagons across
+DECIMATE_BINS = 2000
+DENSITY_GRIDSIZE = 150
+# groups with fewer points than this are still drawn point by point
+DENSITY_MIN_POINTS = 1000
+
+
+def pyplot():
+    # matplotlib takes most of a second to import, so
+    # it's left out until there's a figure to draw
+    import matplotlib.pyplot as plt
+    return plt
+
 
 class Benchmark:
     def __init__(self, benchmark_dir):
-        benchmark_name = benchmark_dir.name
+        self.benchmark_dir = benchmark_dir
+        self.name = benchmark_dir.name
 
         # positive targets
-        benchmark_pos = benchmark_dir / f"{benchmark_name}.pos"
+        benchmark_pos = benchmark_dir / f"{self.name}.pos"
 
         self.positives = []
         with open(benchmark_pos) as file:
@@ -36,74 +89,32 @@ class Benchmark:
         self.num_queries = len(self.queries)
         self.num_true_positives = len(self.positives)
 
-        # target lengths
-        benchmark_target_fa = benchmark_dir / f"{benchmark_name}.test.fa"
-        command = ["esl-seqstat", "-a", benchmark_target_fa]
-        result = subprocess.run(
-            command, stdout=subprocess.PIPE, text=True, check=True)
+    # the lengths are only needed for the cells figure, and
+    # reading them means going through the whole target database
+    @cached_property
+    def target_lengths(self):
+        lengths = fasta_lengths(self.benchmark_dir / f"{self.name}.test.fa")
+        for (_, t) in self.long_seq_paths():
+            lengths += fasta_lengths(t)
 
-        lines = result.stdout.splitlines()
-
-        self.target_lengths = {}
-        for line in lines:
-            if not line.startswith("="):
-                continue
-
-            tokens = line.split()
-            name = tokens[1]
-            length = int(tokens[2])
-            self.target_lengths[name] = length
+        return lengths
 
+    @cached_property
+    def query_lengths(self):
         # query (model) lengths
-        benchmark_query_hmm = benchmark_dir / f"{benchmark_name}.train.hmm"
-
-        command = ["hmmstat", benchmark_query_hmm]
-        result = subprocess.run(
-            command, stdout=subprocess.PIPE, text=True, check=True)
-
-        lines = result.stdout.splitlines()
+        lengths = hmm_lengths(self.benchmark_dir / f"{self.name}.train.hmm")
+        for (q, _) in self.long_seq_paths():
+            lengths += fasta_lengths(q)
 
-        self.query_lengths = {}
-        for line in lines:
-            if line.startswith("#"):
-                continue
-
-            tokens = line.split()
-            name = tokens[1]
-            length = int(tokens[3])
-            self.query_lengths[name] = length
+        return lengths
 
+    def long_seq_paths(self):
         long_seq_target_paths = (
-            benchmark_dir / "long-seq/target/").glob("*.fa")
+            self.benchmark_dir / "long-seq/target/").glob("*.fa")
         long_seq_query_paths = (
-            benchmark_dir / "long-seq/query/").glob("*.fa")
+            self.benchmark_dir / "long-seq/query/").glob("*.fa")
 
-        for (q, t) in zip(long_seq_query_paths, long_seq_target_paths):
-            command = ["esl-seqstat", "-a", q]
-            result = subprocess.run(
-                command, stdout=subprocess.PIPE, text=True, check=True)
-            lines = result.stdout.splitlines()
-            for line in lines:
-                if not line.startswith("="):
-                    continue
-
-                tokens = line.split()
-                name = tokens[1]
-                length = int(tokens[2])
-                self.query_lengths[name] = length
-
-            command = ["esl-seqstat", "-a", t]
-            result = subprocess.run(
-                command, stdout=subprocess.PIPE, text=True, check=True)
-            lines = result.stdout.splitlines()
-            for line in lines:
-                if not line.startswith("="):
-                    continue
-
-                tokens = line.split()
-                name = tokens[1]
-                length = int(tokens[2])
-                self.target_lengths[name] = length
+        return zip(long_seq_query_paths, long_seq_target_paths)
 
 
 class Positive:
@@ -123,245 +134,19 @@ class Positive:
         return f"{self.name}\t{self.id}\t{self.start}..{self.end}"
 
 
-class Cols:
-    def __init__(
-        self,
-        target,
-        query,
-        evalue,
-        target_start=None,
-        target_end=None,
-        query_start=None,
-        query_end=None,
-        score=None,
-        bias=None,
-        cell_frac=None,
-    ):
-        self.target = target
-        self.query = query
-        self.target_start = target_start
-        self.target_end = target_end
-        self.query_start = query_start
-        self.query_end = query_end
-        self.evalue = evalue
-        self.score = score
-        self.bias = bias
-        self.cell_frac = cell_frac
-
-
-class Hit:
-    def __init__(
-        self,
-        query_name,
-        target_name,
-        evalue,
-        target_start=None,
-        target_end=None,
-        query_start=None,
-        query_end=None,
-        score=None,
-        bias=None,
-        cell_frac=None,
-    ):
-        self.query_name = query_name
-        self.target_name = target_name
-        self.target_start = target_start,
-        self.target_end = target_end,
-        self.query_start = query_start,
-        self.query_end = query_end,
-        self.evalue = evalue
-        self.score = score
-        self.bias = bias
-        self.cell_frac = cell_frac
-
-    def __str__(self):
-        return f"{self.query_name} {self.target_name} {self.evalue}"
-
-
-class Hits:
-    def __init__(self, path, cols):
-        self.name = " ".join(path.name.split(".")[:-1])
-        self.true_positives = []
-        self.false_positives = []
-        self.other = []
-
-        with open(path) as file:
-            for line in file:
-                if line.startswith("#"):
-                    continue
-
-                line_tokens = line.split()
-                # the target name is formatted like:
-                #     <target_name>/<id>/<from>-<to>, or
-                #     <decoy#>
-                target = line_tokens[cols.target]
-                query_name = line_tokens[cols.query]
-
-                target_start = None
-                if cols.target_start is not None:
-                    target_start = int(line_tokens[cols.target_start])
-
-                target_end = None
-                if cols.target_end is not None:
-                    target_end = int(line_tokens[cols.target_end])
-
-                query_start = None
-                if cols.query_start is not None:
-                    query_start = int(line_tokens[cols.query_start])
-
-                query_end = None
-                if cols.query_end is not None:
-                    query_end = int(line_tokens[cols.query_end])
-
-                evalue = float(line_tokens[cols.evalue])
-
-                score = None
-                if cols.score is not None:
-                    score = float(line_tokens[cols.score])
-
-                bias = None
-                if cols.bias is not None:
-                    bias = float(line_tokens[cols.bias])
-
-                cell_frac = None
-                if cols.cell_frac is not None:
-                    cell_frac = float(line_tokens[cols.cell_frac])
-
-                hit = Hit(
-                    query_name,
-                    target,
-                    evalue,
-                    target_start,
-                    target_end,
-                    query_start,
-                    query_end,
-                    score=score,
-                    bias=bias,
-                    cell_frac=cell_frac
-                )
+def read_hmmer_results(results_dir, cache=None, workers=1):
+    return read_results(*hmmer_results(results_dir), cache, workers)
 
-                if target.startswith("decoy"):
-                    self.false_positives.append(hit)
-                else:
-                    target_tokens = target.split("/")
-                    target_name = target_tokens[0]
-
-                    if (target_start is not None and
-                            target_end is not None and
-                            len(target_tokens) == 3):
-                        target_range = [int(i)
-                                        for i in target_tokens[2].split('-')]
-                        plant_start = target_range[0]
-                        plant_end = target_range[1]
-                        plant_length = plant_end - plant_start + 1
-
-                        overlap_start = max(plant_start, target_start)
-                        overlap_end = min(plant_end, target_end)
-
-                        if overlap_start <= overlap_end:
-                            overlap = overlap_end - overlap_start + 1
-                        else:
-                            overlap = 0
-
-                        overlap_percentage = overlap / plant_length
-
-                        if (target_name == query_name and
-                                overlap_percentage >= 0.50):
-                            self.true_positives.append(hit)
-                        elif (target_name == query_name and
-                                overlap_percentage == 0.0):
-
-                            self.false_positives.append(hit)
-                        else:
-                            self.other.append(hit)
-
-                    else:
-                        if (target_name == query_name):
-                            self.true_positives.append(hit)
-                        else:
-                            self.other.append(hit)
-
-        def sort_key(h): return h.evalue
-
-        self.true_positives.sort(key=sort_key)
-
-        if (self.name == "hmmer" and
-                cols.target_start is not None and
-                cols.target_end is not None):
-            unique_hits = {}
-            for hit in self.true_positives:
-                target_tokens = hit.target_name.split("/")
-                target_name = target_tokens[0]
-
-                if hit.query_name == target_name:
-                    if ((hit.query_name, hit.target_name) not in unique_hits or
-                            hit.evalue < unique_hits[(hit.query_name, hit.target_name)].evalue):
-                        unique_hits[(hit.query_name, hit.target_name)] = hit
-
-            self.true_positives = list(unique_hits.values())
-            self.true_positives.sort(key=sort_key)
-
-        self.false_positives.sort(key=sort_key)
-        self.other.sort(key=sort_key)
-
-    def num_hits(self):
-        return (
-            len(self.true_positives)
-            + len(self.false_positives)
-            + len(self.other)
-        )
-
-    def recall_vs_mean_false(self, num_true_positives, num_queries):
-        t = [h.target_name for h in self.true_positives]
-        tp = list(set([h.target_name for h in self.true_positives]))
-
-        assert (len(t) == len(tp))
-
-        x = []
-        y = []
 
-        combined_hits = [(h, True) for h in self.true_positives] + \
-            [(h, False) for h in self.false_positives]
+def read_mmseqs_results(results_dir, cache=None, workers=1):
+    return read_results(*mmseqs_results(results_dir), cache, workers)
 
-        combined_hits.sort(key=lambda h: h[0].evalue)
-
-        true_count = 0
-        false_count = 0
-        y_first = None
-        fdr_point = None
-
-        for (hit, is_true) in combined_hits:
-            if is_true:
-                true_count += 1
-            else:
-                false_count += 1
 
-            recall = true_count / num_true_positives
-            mean_false_positive = false_count / num_queries
+def read_nail_results(results_dir, cache=None, workers=1):
+    return read_results(*nail_results(results_dir), cache, workers)
 
-            x.append(mean_false_positive)
-            y.append(recall)
 
-            if fdr_point is None:
-                false_discovery_rate = false_count / true_count
-                if abs(0.01 - false_discovery_rate) < 1e-3:
-                    fdr_point = (mean_false_positive, recall)
-
-        for (idx, val) in enumerate(x):
-            if val > 0:
-                y_first = y[idx - 1]
-                break
-
-        if y_first is None:
-            y_first = 0
-
-        if fdr_point is None:
-            fdr_point = (0, 0)
-
-        return (x, y, y_first, fdr_point)
-
-
-def read_hmmer_results(results_dir):
+def hmmer_results(results_dir):
     results_dir = results_dir / "hmmer/"
     # full seq E-value
     # cols = Cols(0, 2, 4)
@@ -380,10 +165,10 @@ def read_hmmer_results(results_dir):
 
     paths = results_dir.glob("*.domtbl")
 
-    return [Hits(p, cols) for p in paths]
+    return (paths, cols)
 
 
-def read_mmseqs_results(results_dir):
+def mmseqs_results(results_dir):
     results_dir = results_dir / "mmseqs/"
     cols = Cols(0, 1, 6,
                 target_start=2,
@@ -394,10 +179,10 @@ def read_mmseqs_results(results_dir):
 
     paths = results_dir.glob("*.tsv")
 
-    return [Hits(p, cols) for p in paths]
+    return (paths, cols)
 
 
-def read_nail_results(results_dir):
+def nail_results(results_dir):
     results_dir = results_dir / "nail/"
     cols = Cols(0, 1, 8,
                 target_start=2,
@@ -411,10 +196,63 @@ def read_nail_results(results_dir):
 
     paths = results_dir.glob("*.tsv")
 
-    return [Hits(p, cols) for p in paths]
+    return (paths, cols)
+
+
+def decimate(x, y, bins=DECIMATE_BINS):
+    # x never decreases down a recall curve, so keeping the ends of each
+    # bin's run of points keeps every step to within a bin's width
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    positive = x > 0
+    if len(x) <= 2 * bins or not positive.any():
+        return (x, y)
+
+    edges = np.geomspace(x[positive].min(), x.max(), bins)
+    changes = np.flatnonzero(np.diff(np.searchsorted(edges, x)))
+    keep = np.unique(np.concatenate([[0, len(x) - 1], changes, changes + 1]))
+
+    return (x[keep], y[keep])
+
+
+def density(x, y, color, extent, log=True):
+    # a hexbin of the points, shaded from faint to `color` by the log of the
+    # count in each hexagon, and rasterized so the figure stays small
+    plt = pyplot()
+    from matplotlib.colors import LinearSegmentedColormap, to_rgba
+
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if log:
+        # a log axis can't show zeros anyway
+        keep = (x > 0) & (y > 0)
+        (x, y) = (x[keep], y[keep])
 
+    if len(x) == 0:
+        return
 
-def plot_recall(hits, num_true_positives, num_queries, figures_path):
+    cmap = LinearSegmentedColormap.from_list(
+        "density", [to_rgba(color, 0.15), to_rgba(color, 1.0)])
+
+    plt.hexbin(
+        x,
+        y,
+        xscale='log' if log else 'linear',
+        yscale='log' if log else 'linear',
+        gridsize=DENSITY_GRIDSIZE,
+        extent=extent,
+        bins='log',
+        mincnt=1,
+        cmap=cmap,
+        linewidths=0,
+        rasterized=True,
+    )
+
+
+def plot_recall(hits, num_true_positives, num_queries, figures_path,
+                dense=False):
+    plt = pyplot()
     plt.close('all')
     plt.figure(figsize=figsize)
 
@@ -454,6 +292,9 @@ def plot_recall(hits, num_true_positives, num_queries, figures_path):
         ymin = min(ymin, y_first)
         ymax = max(ymax, y[-1])
 
+        if dense:
+            (x, y) = decimate(x, y)
+
         plt.plot(
             x,
             y,
@@ -501,7 +342,7 @@ def plot_recall(hits, num_true_positives, num_queries, figures_path):
         labelright=True,
     )
 
-    plt.xlim(1e-3, 1e1)
+    plt.xlim(1e-3, max_mean_false)
     plt.ylim(0.2, 0.9)
 
     plt.legend(loc='upper left')
@@ -510,44 +351,22 @@ def plot_recall(hits, num_true_positives, num_queries, figures_path):
     # plt.show()
 
 
-def plot_nail_bitscore(nail_hits, figures_path):
+def plot_nail_bitscore(nail_hits, figures_path, dense=False):
+    plt = pyplot()
     plt.close('all')
     plt.figure(figsize=figsize)
 
     default_hits = next(filter(lambda h: h.name == "nail default", nail_hits))
     full_hits = next(filter(lambda h: h.name == "nail full", nail_hits))
 
-    # take the target names of all of the default true positives
-    target_names = [h.target_name for h in default_hits.true_positives]
-
-    # find all of the full DP hits that have the same target name
-    full_matched_hits = list(filter(
-        lambda h: h.target_name in target_names,
-        full_hits.true_positives)
-    )
+    # pair up the true positives that both runs found on the same target
+    matched = join(full_hits.true_positives, default_hits.true_positives)
 
     # we should never have more full DP hits matched to the default hits
-    assert (len(full_matched_hits) <= len(default_hits.true_positives))
-
-    # just in case there were some default hits that don't match to a full
-    # DP hit, take the set of target names from the matched full hits
-    full_matched_target_names = [h.target_name for h in full_matched_hits]
-
-    # now subset the default hits using the reduced target names
-    default_matched_hits = list(filter(
-        lambda h: h.target_name in full_matched_target_names,
-        default_hits.true_positives)
-    )
-
-    # now we should have the same number of default & full DP hits
-    assert (len(default_matched_hits) == len(full_matched_hits))
+    assert (len(matched) <= len(default_hits.true_positives))
 
-    def s(h): return h.target_name
-    default_matched_hits.sort(key=s)
-    full_matched_hits.sort(key=s)
-
-    x = [h.score for h in full_matched_hits]
-    y = [h.score for h in default_matched_hits]
+    x = matched.left_rows().score
+    y = matched.right_rows().score
 
     max_x = max(x)
     max_y = max(y)
@@ -559,15 +378,19 @@ def plot_nail_bitscore(nail_hits, figures_path):
     plt.plot(x, fit_line(x), color=colors[2], label="Trend")
     plt.plot([0, max_val], [0, max_val], color=colors[0], label="y = x")
 
-    plt.scatter(
-        x,
-        y,
-        color=colors[1],
-        marker='^',
-        label='True Positives',
-        s=10,
-        alpha=0.8
-    )
+    if dense and len(x) >= DENSITY_MIN_POINTS:
+        density(x, y, colors[1], (0, max_val, 0, max_val), log=False)
+        plt.scatter([], [], color=colors[1], marker='^', label='True Positives')
+    else:
+        plt.scatter(
+            x,
+            y,
+            color=colors[1],
+            marker='^',
+            label='True Positives',
+            s=10,
+            alpha=0.8
+        )
 
     plt.xlabel('Sequence Bitscore of Full Forward-Backward')
     plt.ylabel('Sequence Bitscore of Sparse Forward-Backward')
@@ -591,7 +414,8 @@ def plot_nail_bitscore(nail_hits, figures_path):
     # plt.show()
 
 
-def plot_nail_cells(nail_hits, benchmark, figures_path):
+def plot_nail_cells(nail_hits, benchmark, figures_path, dense=False):
+    plt = pyplot()
     plt.close('all')
     plt.figure(figsize=figsize)
 
@@ -630,14 +454,18 @@ def plot_nail_cells(nail_hits, benchmark, figures_path):
     ]
 
     for (i, (hits, l, c, m, a)) in enumerate(zip(hits_groups, labels, color, markers, alphas)):
-        x = []
-        y = []
-        for hit in hits:
-            query_length = benchmark.query_lengths[hit.query_name]
-            target_length = benchmark.target_lengths[hit.target_name]
-            num_cells = query_length * target_length
-            x.append(num_cells)
-            y.append(hit.cell_frac)
+        # look the lengths up once per name, then gather them per hit
+        query_lengths = benchmark.query_lengths.lookup(hits.query_names)
+        target_lengths = benchmark.target_lengths.lookup(hits.target_names)
+
+        x = query_lengths[hits.query] * target_lengths[hits.target]
+        y = hits.cell_frac
+
+        # the hexagons line up with the figure's limits, in log10 space
+        if dense and len(x) >= DENSITY_MIN_POINTS:
+            density(x, y, c, (2, 10, -5, math.log10(1.1)))
+            plt.scatter([], [], color=c, marker=m, label=l)
+            continue
 
         plt.scatter(
             x,
@@ -675,101 +503,321 @@ def plot_nail_cells(nail_hits, benchmark, figures_path):
 class Time:
     def __init__(self, path):
         self.name = path.name
+
+        # `time -p` format, i.e. "real <sec>", "user <sec>", "sys <sec>"
+        fields = {}
         with open(path) as file:
-            line = file.readline()
-            tokens = line.split()
-            self.seconds = float(tokens[1])
+            for line in file:
+                tokens = line.split()
+                if len(tokens) == 2:
+                    fields[tokens[0]] = float(tokens[1])
+
+        self.seconds = fields["real"]
+        self.cpu_seconds = fields.get("user", 0.0) + fields.get("sys", 0.0)
+
+        # runs wrapped by timed.py also leave a full resource record
+        self.rusage = None
+        self.max_rss_kb = None
+
+        rusage_path = path.with_name(path.stem + ".rusage.json")
+        if rusage_path.exists():
+            with open(rusage_path) as file:
+                self.rusage = json.load(file)
+
+            self.cpu_seconds = self.rusage["cpu"]
+            self.max_rss_kb = self.rusage["max_rss_kb"]
+
+        # runs that were repeated with `orchestrate.py --trials`
+        # keep every trial's wall and CPU time
+        self.trials = []
+        self.cpu_trials = []
+        for trial in sorted(path.parent.glob(f"trials/{path.stem}.*.time")):
+            # e.g. hmmer.max.0.time isn't a trial of hmmer.time
+            (stem, i) = trial.stem.rsplit(".", 1)
+            if stem != path.stem or not i.isdigit():
+                continue
+            t = Time(trial)
+            self.trials.append(t.seconds)
+            self.cpu_trials.append(t.cpu_seconds)
 
 
-def plot_time(results_dir, hits, num_true_positives, num_queries, figures_path):
-    plt.close('all')
-    plt.figure(figsize=figsize)
+def interval(samples, method="iqr"):
+    # the spread around the median of repeated trials: the interquartile
+    # range, or a 95% bootstrap confidence interval of the median
+    samples = np.asarray(samples, dtype=np.float64)
 
-    hmmer_dir = results_dir / "hmmer/"
-    hmmer_paths = hmmer_dir.glob("*.time")
-    hmmer_times = {t.name: t for t in [Time(p) for p in hmmer_paths]}
+    if method == "iqr":
+        return tuple(np.percentile(samples, [25, 75]))
 
-    mmseqs_dir = results_dir / "mmseqs/"
-    mmseqs_paths = mmseqs_dir.glob("*.time")
-    mmseqs_times = {t.name: t for t in [Time(p) for p in mmseqs_paths]}
+    rng = np.random.default_rng(0)
+    resampled = rng.choice(samples, size=(BOOTSTRAP_SAMPLES, len(samples)))
+    medians = np.median(resampled, axis=1)
 
-    nail_dir = results_dir / "nail/"
-    nail_paths = nail_dir.glob("*.time")
-    nail_times = {t.name: t for t in [Time(p) for p in nail_paths]}
+    return tuple(np.percentile(medians, [2.5, 97.5]))
 
-    hmmer_time = hmmer_times["hmmer.time"].seconds,
 
-    nail_default_time = nail_times["nail.default.time"].seconds
+def prep_times(results_dir):
+    # tool -> the total wall time of its prep steps (<tool>.prep*.time,
+    # including every shard's); tools without prep steps are left out
+    prep = {}
+    for tool in ["hmmer", "mmseqs", "nail"]:
+        paths = [p for p in (results_dir / tool).rglob(f"{tool}.prep*.time")
+                 if p.parent.name != "trials"]
+        if paths:
+            prep[tool] = sum(Time(p).seconds for p in paths)
 
-    nail_full_time = nail_times["nail.full.time"].seconds
+    return prep
 
-    mmseqs_default_time = mmseqs_times["mmseqs.default.time"].seconds
 
-    mmseqs_sensitive_time = mmseqs_times["mmseqs.sensitive.time"].seconds
+def read_times(results_dir):
+    times = {}
+    for tool in ["hmmer", "mmseqs", "nail"]:
+        for path in (results_dir / tool).glob("*.time"):
+            time = Time(path)
+            times[time.name] = time
 
-    mmseqs_nail_time = mmseqs_times["mmseqs.nail.time"].seconds
+    return times
 
-    times = [
-        hmmer_time,
-        nail_full_time,
-        nail_default_time,
-        mmseqs_nail_time,
-        mmseqs_sensitive_time,
-        mmseqs_default_time,
-    ]
 
-    hmmer_hits = next(filter(lambda h: h.name == "hmmer", hits))
-    nail_full_hits = next(filter(lambda h: h.name == "nail full", hits))
-    nail_default_hits = next(filter(lambda h: h.name == "nail default", hits))
-    mmseqs_nail_hits = next(filter(lambda h: h.name == "mmseqs nail", hits))
-    mmseqs_sensitive_hits = next(
-        filter(lambda h: h.name == "mmseqs sensitive", hits))
-    mmseqs_default_hits = next(
-        filter(lambda h: h.name == "mmseqs default", hits))
+# the configurations that are compared in the resource figures:
+#   (time file, hits name, label, color, marker)
+resource_configs = [
+    ("hmmer.time", "hmmer", "hmmsearch (default)", colors[1], 'o'),
+    ("nail.full.time", "nail full", "nail (full DP)", colors[2], 'o'),
+    ("nail.default.time", "nail default", "nail (default)", colors[2], 'D'),
+    ("mmseqs.nail.time", "mmseqs nail",
+     "mmseqs (nail pipeline settings)", colors[0], 'o'),
+    ("mmseqs.sensitive.time", "mmseqs sensitive",
+     "mmseqs (sensitive)", colors[0], 'D'),
+    ("mmseqs.default.time", "mmseqs default",
+     "mmseqs (default)", colors[0], 's'),
+]
 
-    hits = [
-        hmmer_hits,
-        nail_full_hits,
-        nail_default_hits,
-        mmseqs_nail_hits,
-        mmseqs_sensitive_hits,
-        mmseqs_default_hits,
-    ]
 
-    recalls = [
-        h.recall_vs_mean_false(
-            num_true_positives, num_queries
-        )[2] for h in hits
-    ]
+def read_sweep(results_dir):
+    # the table written by sweep.py, as a list of dicts, or None
+    path = results_dir / "sweep/sweep.tsv"
+    if not path.exists():
+        return None
+
+    with open(path) as file:
+        header = file.readline().rstrip("\n").split("\t")
+        rows = []
+        for line in file:
+            row = dict(zip(header, line.rstrip("\n").split("\t")))
+            for c in ["runtime", "cpu", "recall"]:
+                row[c] = float(row[c])
+            row["pareto"] = row["pareto"] == "*"
+            rows.append(row)
+
+    return rows
+
+
+def metrics(hits, times, num_true_positives, num_queries, prep=None):
+    # the headline numbers of every run, for checks that don't need figures:
+    # recall before the first false positive, the 1% FDR point, the
+    # resources of the timed run (e.g. "nail default" -> nail.default.time)
+    # and the time its tool spent on prep, from prep_times()
+    runs = {}
+    for h in hits:
+        # the long-seq searches aren't scored against the benchmark
+        if h.name == "long-seq":
+            continue
+
+        (_, _, y_first, (x_fdr, y_fdr)) = h.recall_vs_mean_false(
+            num_true_positives, num_queries)
 
-    labels = [
-        "hmmsearch (default)",
-        "nail (full DP)",
-        "nail (default)",
-        "mmseqs (nail pipeline settings)",
-        "mmseqs (sensitive)",
-        "mmseqs (default)",
-    ]
+        run = {
+            "recall_before_first_false_positive": float(y_first),
+            "fdr_1pct": {
+                "mean_false_positives": float(x_fdr),
+                "recall": float(y_fdr),
+            },
+        }
+
+        time = times.get(h.name.replace(" ", ".") + ".time")
+        if time is not None:
+            run["runtime"] = time.seconds
+            run["cpu"] = time.cpu_seconds
+            run["max_rss_kb"] = time.max_rss_kb
+            if time.trials:
+                run["trials"] = time.trials
+
+        tool = h.name.split()[0]
+        if prep and tool in prep:
+            run["prep"] = prep[tool]
+
+        runs[h.name] = run
+
+    return runs
+
+
+def write_metrics(benchmark, hits, results_dir, path):
+    runs = metrics(hits, read_times(results_dir),
+                   benchmark.num_true_positives, benchmark.num_queries,
+                   prep_times(results_dir))
+
+    out = {
+        "benchmark": benchmark.name,
+        "num_queries": benchmark.num_queries,
+        "num_true_positives": benchmark.num_true_positives,
+        "runs": runs,
+    }
+
+    if (results_dir / "latency").is_dir():
+        from latency import LATENCY_PERCENTILES, latency_percentiles, read_latency
+
+        out["latency"] = {
+            config: {
+                "searches": n,
+                **{f"p{p}": v for (p, v) in zip(LATENCY_PERCENTILES, values)},
+                "max": top,
+            }
+            for (config, (n, values, top)) in
+            latency_percentiles(read_latency(results_dir / "latency")).items()
+        }
+
+    if str(path) == "-":
+        json.dump(out, sys.stdout, indent=2)
+        print()
+    else:
+        with open(path, "w") as file:
+            json.dump(out, file, indent=2)
+
+
+def plot_time(results_dir, hits, num_true_positives, num_queries, figures_path,
+              intervals="iqr"):
+    times = read_times(results_dir)
+    sweep = read_sweep(results_dir)
+
+    plot_resource(
+        times,
+        hits,
+        num_true_positives,
+        num_queries,
+        lambda t: t.seconds,
+        ylabel='Runtime (sec)',
+        title='Pfam Domain Benchmark: Runtime vs Recall before First False Positive',
+        path=figures_path / "runtime.pdf",
+        ylim=[1e1, 10e3],
+        sweep=sweep and [(r["recall"], r["runtime"], r["pareto"]) for r in sweep],
+        samples=lambda t: t.trials,
+        intervals=intervals,
+    )
 
-    color = [
-        colors[1],
-        colors[2],
-        colors[2],
-        colors[0],
-        colors[0],
-        colors[0],
-    ]
+    plot_resource(
+        times,
+        hits,
+        num_true_positives,
+        num_queries,
+        lambda t: t.cpu_seconds,
+        ylabel='CPU Time, User + System (sec)',
+        title='Pfam Domain Benchmark: CPU Time vs Recall before First False Positive',
+        path=figures_path / "cpu.pdf",
+        sweep=sweep and [(r["recall"], r["cpu"], r["pareto"]) for r in sweep],
+        samples=lambda t: t.cpu_trials,
+        intervals=intervals,
+    )
 
-    markers = [
-        'o',
-        'o',
-        'D',
-        'o',
-        'D',
-        's',
-    ]
+    # peak memory is only known for runs that were wrapped by timed.py
+    if all(times[c[0]].max_rss_kb is not None for c in resource_configs):
+        plot_resource(
+            times,
+            hits,
+            num_true_positives,
+            num_queries,
+            lambda t: t.max_rss_kb / 2**20,
+            ylabel='Peak Memory (GB)',
+            title='Pfam Domain Benchmark: Peak Memory vs Recall before First False Positive',
+            path=figures_path / "memory.pdf",
+        )
+
+
+def plot_amortized(results_dir, figures_path):
+    # the runtime per search when a tool's prep is shared by N searches,
+    # against the search alone; a tool without prep steps costs the same
+    times = read_times(results_dir)
+    prep = prep_times(results_dir)
+    if not prep:
+        return
+
+    plt = pyplot()
+    plt.close('all')
+    plt.figure(figsize=figsize)
+
+    searches = np.geomspace(*AMORTIZE_SEARCHES, 50)
+
+    for (time_name, _, l, c, m) in resource_configs:
+        if time_name not in times:
+            continue
+
+        search = times[time_name].seconds
+        tool_prep = prep.get(time_name.split(".")[0], 0.0)
+
+        plt.plot(
+            searches,
+            search + tool_prep / searches,
+            color=c,
+            marker=m,
+            markevery=[0],
+            label=f"{l}: {tool_prep:.0f}s prep",
+        )
+        plt.axhline(
+            y=search,
+            linestyle='--',
+            alpha=0.4,
+            color=c,
+        )
+
+    plt.plot([], [], color='black', linestyle='--', alpha=0.4,
+             label='Search Alone')
+
+    plt.xscale('log')
+    plt.yscale('log')
+
+    plt.xlabel('Searches Sharing One Prep')
+    plt.ylabel('Runtime per Search, with Prep (sec)')
+    plt.title('Pfam Domain Benchmark: Prep Time Amortized over Searches')
+
+    plt.legend(loc='upper right')
+    plt.grid()
+
+    plt.savefig(figures_path / "amortized.pdf")
+
+
+def plot_resource(times, hits, num_true_positives, num_queries, value,
+                  ylabel, title, path, ylim=None, sweep=None, samples=None,
+                  intervals="iqr"):
+    plt = pyplot()
+    plt.close('all')
+    plt.figure(figsize=figsize)
+
+    # the points of a nail parameter sweep, as (recall, value, on frontier)
+    if sweep:
+        plt.scatter(
+            [x for (x, _, _) in sweep],
+            [y for (_, y, _) in sweep],
+            color='gray',
+            marker='.',
+            alpha=0.6,
+            label='nail (parameter sweep)',
+        )
+
+        frontier = sorted((x, y) for (x, y, p) in sweep if p)
+        plt.step(
+            [x for (x, _) in frontier],
+            [y for (_, y) in frontier],
+            where='post',
+            color='gray',
+            linestyle='--',
+            label='nail (sweep Pareto frontier)',
+        )
+
+    for (time_name, hits_name, l, c, m) in resource_configs:
+        h = next(filter(lambda h: h.name == hits_name, hits))
+        x = h.recall_vs_mean_false(num_true_positives, num_queries)[2]
+        y = value(times[time_name])
 
-    for x, y, l, c, m in zip(recalls, times, labels, color, markers):
         plt.scatter(
             x,
             y,
@@ -778,9 +826,22 @@ def plot_time(results_dir, hits, num_true_positives, num_queries, figures_path):
             label=l,
         )
 
+        # repeated trials get error bars around the median
+        trials = [] if samples is None else samples(times[time_name])
+        if len(trials) > 1:
+            (lo, hi) = interval(trials, intervals)
+            plt.errorbar(
+                x,
+                y,
+                yerr=[[max(y - lo, 0)], [max(hi - y, 0)]],
+                fmt='none',
+                ecolor=c,
+                capsize=4,
+            )
+
     plt.xlabel('Recall before First False Positive')
-    plt.ylabel('Runtime (sec)')
-    plt.title('Pfam Domain Benchmark: Runtime vs Recall before First False Positive')
+    plt.ylabel(ylabel)
+    plt.title(title)
 
     plt.yscale('log')
 
@@ -794,42 +855,383 @@ def plot_time(results_dir, hits, num_true_positives, num_queries, figures_path):
     )
 
     plt.xlim([0.2, 0.7])
-    plt.ylim([1e1, 10e3])
+    if ylim is not None:
+        plt.ylim(ylim)
 
     plt.legend(loc='upper left')
     plt.grid()
 
-    plt.savefig(figures_path / "runtime.pdf")
+    plt.savefig(path)
     # plt.show()
 
 
-if __name__ == "__main__":
-    figures_path = Path("figures/")
-    if len(sys.argv) < 2:
-        print("usage: ./recall.py <benchmark_dir> [figures/]")
-        exit()
-    elif len(sys.argv) > 2:
-        figures_path = Path(sys.argv[2])
+def plot_thread_scaling(threads_dir, figures_path):
+    # threads_dir holds one results directory per thread
+    # count, as written by run-threads.sh
+    runs = sorted(
+        (int(d.name), read_times(d))
+        for d in threads_dir.iterdir()
+        if d.is_dir() and d.name.isdigit()
+    )
 
-    figures_path.mkdir(parents=True, exist_ok=True)
+    if len(runs) < 2:
+        return
+
+    plt = pyplot()
+    for (figure, ylabel, ideal) in [
+        ("speedup.pdf", "Speedup", lambda n, n0: n / n0),
+        ("efficiency.pdf", "Parallel Efficiency", lambda n, n0: 1.0),
+    ]:
+        plt.close('all')
+        plt.figure(figsize=figsize)
+
+        all_threads = [n for (n, _) in runs]
+        n0 = all_threads[0]
+
+        plt.plot(
+            all_threads,
+            [ideal(n, n0) for n in all_threads],
+            color='black',
+            linestyle='--',
+            alpha=0.4,
+            label='Ideal',
+        )
+
+        for (time_name, _, l, c, m) in resource_configs:
+            points = [
+                (n, times[time_name].seconds)
+                for (n, times) in runs
+                if time_name in times
+            ]
+
+            if len(points) < 2:
+                continue
+
+            threads = np.array([n for (n, _) in points])
+            seconds = np.array([t for (_, t) in points])
+
+            # relative to the fewest threads this configuration was run with
+            speedup = seconds[0] / seconds
+            if figure == "efficiency.pdf":
+                y = speedup * threads[0] / threads
+            else:
+                y = speedup
+
+            plt.plot(
+                threads,
+                y,
+                color=c,
+                marker=m,
+                label=l,
+            )
+
+        plt.xscale('log', base=2)
+        if figure == "speedup.pdf":
+            plt.yscale('log', base=2)
+        else:
+            plt.ylim(0, 1.1)
+
+        plt.xticks(all_threads, [str(n) for n in all_threads])
+
+        plt.xlabel('Threads')
+        plt.ylabel(ylabel)
+        plt.title(f'Pfam Domain Benchmark: {ylabel} vs Threads')
+
+        plt.legend(loc='upper left' if figure == "speedup.pdf" else 'lower left')
+        plt.grid()
+
+        plt.savefig(figures_path / figure)
+
+
+# the length-scaling configurations: (name, label, color, marker)
+scaling_configs = [
+    ("hmmer", "hmmsearch (default)", colors[1], 'o'),
+    ("hmmer-max", "hmmsearch (--max)", colors[1], 's'),
+    ("nail-full", "nail (full DP)", colors[2], 'o'),
+    ("nail-sparse", "nail (default)", colors[2], 'D'),
+]
 
-    benchmark_dir = Path(sys.argv[1])
-    results_dir = benchmark_dir / "results/"
 
-    hmmer_hits = read_hmmer_results(results_dir)
-    nail_hits = read_nail_results(results_dir)
-    mmseqs_hits = read_mmseqs_results(results_dir)
+def plot_length_scaling(scaling_dir, figures_path):
+    # scaling.py pulls in the job scheduler, so
+    # it's only imported when there's a figure
+    from scaling import fit_power, read_scaling
 
-    all_hits = hmmer_hits + nail_hits + mmseqs_hits
+    # scaling_dir is written by scaling.py
+    runs = read_scaling(scaling_dir)
+    if not runs:
+        return
+
+    plt = pyplot()
+    for (figure, ylabel, column, unit) in [
+        ("scaling-time.pdf", "Runtime (sec)", 1, 1.0),
+        ("scaling-memory.pdf", "Peak Memory (GB)", 2, 2**20),
+    ]:
+        plt.close('all')
+        plt.figure(figsize=figsize)
+
+        for (config, l, c, m) in scaling_configs:
+            if config not in runs:
+                continue
+
+            cells = runs[config][0]
+            y = runs[config][column] / unit
+
+            plt.scatter(cells, y, color=c, marker=m)
+
+            if len(np.unique(cells)) < 2:
+                plt.plot([], [], color=c, marker=m, label=l)
+                continue
+
+            (coef, exponent) = fit_power(cells, y)
+            x = np.geomspace(cells.min(), cells.max(), 50)
+            plt.plot(
+                x,
+                coef * x ** exponent,
+                color=c,
+                marker=m,
+                markevery=[0],
+                label=f"{l}: ~cells^{exponent:.2f}",
+            )
+
+        plt.xscale('log')
+        plt.yscale('log')
+
+        plt.xlabel('Query Length x Target Length (cells)')
+        plt.ylabel(ylabel)
+        plt.title(f'Pfam Domain Benchmark: {ylabel} vs DP Matrix Size')
+
+        plt.legend(loc='upper left')
+        plt.grid()
+
+        plt.savefig(figures_path / figure)
+
+
+# the latency configurations: (name, label, color, marker)
+latency_configs = [
+    ("hmmer", "hmmsearch (default)", colors[1], 'o'),
+    ("nail-full", "nail (full DP)", colors[2], 'o'),
+    ("nail-default", "nail (default)", colors[2], 'D'),
+    ("nail-no-filters", "nail (no filters)", colors[2], 's'),
+    ("mmseqs-nail", "mmseqs (nail pipeline settings)", colors[0], 'o'),
+    ("mmseqs-sensitive", "mmseqs (sensitive)", colors[0], 'D'),
+    ("mmseqs-default", "mmseqs (default)", colors[0], 's'),
+]
+
+
+def plot_latency(latency_dir, figures_path):
+    # like scaling.py, latency.py pulls in the job scheduler
+    from latency import LATENCY_PERCENTILES, latency_percentiles, read_latency
+
+    # latency_dir is written by latency.py
+    runs = read_latency(latency_dir)
+    if not runs:
+        return
+
+    percentiles = latency_percentiles(runs)
+
+    plt = pyplot()
+    plt.close('all')
+    plt.figure(figsize=figsize)
+
+    for (config, l, c, m) in latency_configs:
+        if config not in runs:
+            continue
+
+        (_, lengths, seconds) = runs[config]
+        (_, values, _) = percentiles[config]
+
+        plt.scatter(lengths, seconds, color=c, marker=m, alpha=0.6,
+                    label=f"{l}: " + ", ".join(
+                        f"p{p} {v:.2g}s"
+                        for (p, v) in zip(LATENCY_PERCENTILES, values)))
+
+        # the tail of each configuration, across all of the model lengths
+        plt.axhline(y=values[-1], color=c, linestyle='--', alpha=0.4)
+
+    plt.plot([], [], color='black', linestyle='--', alpha=0.4,
+             label=f'p{LATENCY_PERCENTILES[-1]}')
+
+    plt.yscale('log')
+
+    plt.xlabel('Model Length')
+    plt.ylabel('Single-Query Runtime (sec)')
+    plt.title('Pfam Domain Benchmark: Per-Query Latency vs Model Length')
+
+    plt.legend(loc='upper left', fontsize='small')
+    plt.grid()
+
+    plt.savefig(figures_path / "latency.pdf")
+
+
+def plot_dbsize(dbsize_dir, figures_path):
+    # dbsize.py pulls in the job scheduler too
+    from dbsize import read_dbsize
+    from scaling import fit_power
+
+    # dbsize_dir is written by dbsize.py
+    runs = read_dbsize(dbsize_dir)
+    if not runs:
+        return
+
+    plt = pyplot()
+    for (figure, ylabel, throughput) in [
+        ("dbsize-time.pdf", "Runtime (sec)", False),
+        ("dbsize-throughput.pdf", "Throughput (residues/sec)", True),
+    ]:
+        plt.close('all')
+        plt.figure(figsize=figsize)
+
+        # the configurations are named as in latency.py
+        for (config, l, c, m) in latency_configs:
+            if config not in runs:
+                continue
+
+            (residues, seconds) = runs[config]
+            y = residues / seconds if throughput else seconds
+
+            plt.scatter(residues, y, color=c, marker=m)
+
+            if len(np.unique(residues)) < 2:
+                plt.plot([], [], color=c, marker=m, label=l)
+                continue
+
+            # runtime ~ residues^e makes throughput ~ residues^(1 - e)
+            (coef, exponent) = fit_power(residues, seconds)
+            if throughput:
+                shown = 1 - exponent
+            else:
+                shown = exponent
+            x = np.geomspace(residues.min(), residues.max(), 50)
+            fit = coef * x ** exponent
+            plt.plot(
+                x,
+                x / fit if throughput else fit,
+                color=c,
+                marker=m,
+                markevery=[0],
+                label=f"{l}: ~residues^{shown:.2f}",
+            )
+
+        plt.xscale('log')
+        plt.yscale('log')
+
+        plt.xlabel('Target Database Size (residues)')
+        plt.ylabel(ylabel)
+        plt.title(f'Pfam Domain Benchmark: {ylabel} vs Database Size')
+
+        plt.legend(loc='upper left')
+        plt.grid()
+
+        plt.savefig(figures_path / figure)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="produce the benchmark figures")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("figures_path", type=Path, nargs="?",
+                        default=Path("figures/"))
+    parser.add_argument("-j", "--workers", type=int, default=default_workers(),
+                        help="number of processes used to parse result files")
+    parser.add_argument("--intervals", choices=INTERVALS, default="iqr",
+                        help="the error bars of repeated trials: interquartile "
+                        "range, or a bootstrap 95%% interval of the median")
+    parser.add_argument("--stream", action="store_true",
+                        help="evaluate the recall curves online, in bounded "
+                        "memory; the bitscore and cells figures are left out")
+    parser.add_argument("--figures", nargs="+", choices=FIGURES,
+                        default=FIGURES,
+                        help="only draw these figures (default: all of them)")
+    parser.add_argument("--dense", action="store_true",
+                        help="for millions of hits: decimate the recall "
+                        "curves and draw the scatter figures as densities")
+    parser.add_argument("--metrics", type=Path, metavar="PATH",
+                        help="instead of drawing figures, write the recall "
+                        "and resources of every run as JSON to PATH "
+                        "(- for stdout)")
+    args = parser.parse_args()
+
+    figures_path = args.figures_path
+    figures = set() if args.metrics is not None else set(args.figures)
+    if args.stream:
+        figures -= {"bitscore", "cells"}
+
+    benchmark_dir = args.benchmark_dir
+    results_dir = benchmark_dir / "results/"
 
     benchmark = Benchmark(benchmark_dir)
 
-    plot_recall(
-        all_hits, benchmark.num_true_positives, benchmark.num_queries, figures_path)
+    if figures:
+        figures_path.mkdir(parents=True, exist_ok=True)
+
+    if "threads" in figures and (results_dir / "threads").is_dir():
+        plot_thread_scaling(results_dir / "threads", figures_path)
 
-    plot_time(results_dir, all_hits,
-              benchmark.num_true_positives, benchmark.num_queries, figures_path)
+    if "scaling" in figures and (results_dir / "scaling").is_dir():
+        plot_length_scaling(results_dir / "scaling", figures_path)
 
-    plot_nail_bitscore(nail_hits, figures_path)
+    if "prep" in figures:
+        plot_amortized(results_dir, figures_path)
 
-    plot_nail_cells(nail_hits, benchmark, figures_path)
+    if "latency" in figures and (results_dir / "latency").is_dir():
+        plot_latency(results_dir / "latency", figures_path)
+
+    if "dbsize" in figures and (results_dir / "dbsize").is_dir():
+        plot_dbsize(results_dir / "dbsize", figures_path)
+
+    if "timelines" in figures:
+        # the job's own timeline is a copy of its median trial's
+        for table in sorted(results_dir.rglob("*.timeline.tsv")):
+            if table.parent.name != "trials":
+                plot_timeline(table)
+
+    # the metrics and the roc and time figures score every tool,
+    # the bitscore and cells figures only need nail's runs
+    all_tools = args.metrics is not None or bool(figures & {"roc", "time"})
+    if not all_tools and not figures & {"bitscore", "cells"}:
+        sys.exit()
+
+    if args.stream:
+        # only keep as many false positives per tool as fit on the
+        # recall figure; the full tables are never built
+        budget = math.ceil(benchmark.num_queries * max_mean_false)
+
+        nail_hits = stream_results(*nail_results(results_dir), budget)
+        all_hits = (
+            stream_results(*hmmer_results(results_dir), budget)
+            + nail_hits
+            + stream_results(*mmseqs_results(results_dir), budget,
+                             sorted_input=True)
+        )
+    else:
+        # parsed hit tables are cached next to the results, so only
+        # result files that changed since the last run are re-parsed
+        cache = HitCache(results_dir / ".cache")
+
+        nail_hits = read_nail_results(results_dir, cache, args.workers)
+        all_hits = nail_hits
+        if all_tools:
+            hmmer_hits = read_hmmer_results(results_dir, cache, args.workers)
+            mmseqs_hits = read_mmseqs_results(results_dir, cache, args.workers)
+            all_hits = hmmer_hits + nail_hits + mmseqs_hits
+
+    if args.metrics is not None:
+        write_metrics(benchmark, all_hits, results_dir, args.metrics)
+        sys.exit()
+
+    if "roc" in figures:
+        plot_recall(
+            all_hits, benchmark.num_true_positives, benchmark.num_queries, figures_path,
+            args.dense)
+
+    if "time" in figures:
+        plot_time(results_dir, all_hits,
+                  benchmark.num_true_positives, benchmark.num_queries, figures_path,
+                  args.intervals)
+
+    if "bitscore" in figures:
+        plot_nail_bitscore(nail_hits, figures_path, args.dense)
+
+    if "cells" in figures:
+        plot_nail_cells(nail_hits, benchmark, figures_path, args.dense)
@@ -1,7 +1,7 @@
 #! /bin/sh
 
 if [ "$#" == 0 ]; then
-    echo "usage: ./run-all.sh <benchmark-dir> [threads]"
+    echo "usage: ./run-all.sh <benchmark-dir> [threads] [results-dir]"
     exit
 fi
 
@@ -14,6 +14,15 @@ fi
 BENCHMARK_DIR=$1
 SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 
-$SCRIPT_DIR/run-nail.sh $BENCHMARK_DIR $THREADS
-$SCRIPT_DIR/run-mmseqs.sh $BENCHMARK_DIR $THREADS
-$SCRIPT_DIR/run-hmmsearch.sh $BENCHMARK_DIR $THREADS
+if [ -n "$3" ]; then
+    RESULTS_ROOT=$3
+else
+    RESULTS_ROOT=$BENCHMARK_DIR/results
+fi
+
+# the runs themselves are defined in jobs.py; set ORCHESTRATE_ARGS
+# to e.g. "--cores 16 --overlap-timed" to control how they're packed
+python3 $SCRIPT_DIR/orchestrate.py $BENCHMARK_DIR \
+    --threads $THREADS \
+    --results-dir $RESULTS_ROOT \
+    $ORCHESTRATE_ARGS
@@ -1,7 +1,7 @@
 #! /bin/sh
 
 if [ "$#" == 0 ]; then
-    echo "usage: ./run-hmmsearch.sh <benchmark-dir> [threads]"
+    echo "usage: ./run-hmmsearch.sh <benchmark-dir> [threads] [results-dir]"
     exit
 fi
 
@@ -11,37 +11,18 @@ else
     THREADS=1
 fi
 
-E=1e9
-
 BENCHMARK_DIR=$1
-NAME=$(basename "$BENCHMARK_DIR")
-TARGET=$BENCHMARK_DIR/$NAME.test.fa
-QUERY=$BENCHMARK_DIR/$NAME.train.hmm
-
-RESULTS_DIR=$BENCHMARK_DIR/results/hmmer/
-
-TIME=$RESULTS_DIR/hmmer.time
-
-OUT=$RESULTS_DIR/hmmer.out
-TBL=$RESULTS_DIR/hmmer.tbl
-DOM=$RESULTS_DIR/hmmer.domtbl
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
 
-if [ -d "$RESULTS_DIR" ]; then
-    echo "results directory already exists"
-    exit
+if [ -n "$3" ]; then
+    RESULTS_ROOT=$3
+else
+    RESULTS_ROOT=$BENCHMARK_DIR/results
 fi
 
-mkdir -p $RESULTS_DIR
-
-echo "running hmmsearch..."
-/usr/bin/time -p -o $TIME \
-    hmmsearch \
-    --cpu $THREADS \
-    -E $E \
-    -o $OUT \
-    --notextw \
-    --domtblout $DOM \
-    --tblout $TBL \
-    $QUERY $TARGET
-
-awk '/real/ {print "time:", $2}' $TIME
+# the runs themselves are defined in jobs.py; set ORCHESTRATE_ARGS
+# to e.g. "--cores 16 --overlap-timed" to control how they're packed
+python3 $SCRIPT_DIR/orchestrate.py $BENCHMARK_DIR --tools hmmer \
+    --threads $THREADS \
+    --results-dir $RESULTS_ROOT \
+    $ORCHESTRATE_ARGS
@@ -0,0 +1,32 @@
+#! /bin/sh
+
+if [ "$#" == 0 ]; then
+    echo "usage: ./run-threads.sh <benchmark-dir> [threads...]"
+    exit
+fi
+
+BENCHMARK_DIR=$1
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+shift
+
+# by default, sweep powers of two up to all of the cores
+if [ "$#" == 0 ]; then
+    CORES=$(nproc)
+    THREAD_COUNTS=""
+    T=1
+    while [ $T -lt $CORES ]; do
+        THREAD_COUNTS="$THREAD_COUNTS $T"
+        T=$((T * 2))
+    done
+    THREAD_COUNTS="$THREAD_COUNTS $CORES"
+else
+    THREAD_COUNTS="$*"
+fi
+
+# every thread count gets its own results directory, which
+# plots.py picks up to draw the speedup & efficiency curves
+for THREADS in $THREAD_COUNTS; do
+    echo "running all tools with $THREADS threads..."
+    $SCRIPT_DIR/run-all.sh $BENCHMARK_DIR $THREADS $BENCHMARK_DIR/results/threads/$THREADS
+    echo
+done
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+from hitcache import file_digest, file_stamp
+
+STATE_VERSION = 1
+
+# how to ask each tool for its version; anything else
+# is identified by the path of its executable
+VERSION_COMMANDS = {
+    "nail": ["nail", "--version"],
+    "mmseqs": ["mmseqs", "version"],
+    # the version is on the second line of the help banner
+    "hmmsearch": ["hmmsearch", "-h"],
+    "hmmbuild": ["hmmbuild", "-h"],
+}
+VERSION_LINES = 3
+
+
+class RunState:
+    # remembers which jobs have finished, keyed by a hash of everything
+    # that goes into them: the tool's version, the command line, the
+    # digests of the input files and the keys of the jobs they depend on.
+    #
+    # every job with outputs gets a marker file in `state_dir`, which is
+    # written as "running" before it starts and "done" once it succeeds;
+    # a job is skipped if its marker is done with the same key and all of
+    # its outputs are still as it left them. A "running" marker that's
+    # still around at the next start belongs to an interrupted run.
+    def __init__(self, state_dir, rerun=False):
+        self.state_dir = state_dir
+        # still key and record every job, but never skip one
+        self.rerun = rerun
+        self.versions = {}
+        self.digests = read_json(state_dir / "digests.json") or {}
+
+    def marker(self, job):
+        return self.state_dir / (re.sub(r"[^\w.-]+", "-", job.name) + ".json")
+
+    def key(self, job, after_keys):
+        if job.action is not None:
+            command = [job.name]
+            version = None
+        else:
+            command = [normalize(c) for c in job.command]
+            version = self.version(command[0])
+
+        spec = {
+            "version": STATE_VERSION,
+            "command": command,
+            "tool": version,
+            "inputs": {normalize(p): self.digest(p) for p in job.inputs},
+            "after": after_keys,
+        }
+
+        if job.timed() and job.repeated():
+            spec["trials"] = [job.trials, job.cold]
+        if job.sample is not None:
+            spec["sample"] = job.sample
+
+        key = json.dumps(spec, sort_keys=True)
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def version(self, program):
+        if program not in self.versions:
+            self.versions[program] = tool_version(program)
+
+        return self.versions[program]
+
+    def digest(self, path):
+        # digests of the (large) inputs are kept across runs, and
+        # only recomputed when a file's size or mtime changes
+        path = Path(path)
+        if not path.exists():
+            # the job will fail on its own
+            return None
+
+        stamp = file_stamp(path)
+        name = normalize(path)
+
+        entry = self.digests.get(name)
+        if entry is None or entry["stamp"] != stamp:
+            entry = {"stamp": stamp, "digest": file_digest(path)}
+            self.digests[name] = entry
+            write_json(self.state_dir / "digests.json", self.digests)
+
+        return entry["digest"]
+
+    def status(self, job, key):
+        # one of "done", "stale", "interrupted" or "new"
+        marker = read_json(self.marker(job))
+        if marker is None or self.rerun:
+            return "new"
+
+        if marker["state"] == "running":
+            return "interrupted"
+
+        if marker["state"] != "done" or marker["key"] != key:
+            return "stale"
+
+        # a job that now writes more than it used to is run again
+        if any(normalize(p) not in marker["outputs"] for p in job.outputs):
+            return "stale"
+
+        for (path, stamp) in marker["outputs"].items():
+            if not Path(path).exists() or output_stamp(Path(path)) != stamp:
+                return "stale"
+
+        return "done"
+
+    def start(self, job, key):
+        # clear out whatever a previous run left behind; a directory is
+        # rebuilt in place, since other jobs may keep files in it too
+        for path in job.outputs:
+            if not Path(path).is_dir():
+                remove(Path(path))
+
+        write_json(self.marker(job), {"state": "running", "key": key})
+
+    def finish(self, job, key, ok):
+        if not ok:
+            write_json(self.marker(job), {"state": "failed", "key": key})
+            return
+
+        outputs = {normalize(p): output_stamp(Path(p)) for p in job.outputs}
+        write_json(
+            self.marker(job),
+            {"state": "done", "key": key, "outputs": outputs},
+        )
+
+
+def output_stamp(path):
+    # a directory's mtime changes whenever anything is added to it, so
+    # only whether it's still there is checked
+    if path.is_dir():
+        return None
+
+    return file_stamp(path)
+
+
+def normalize(value):
+    # paths are keyed by where they are, not how they were spelled
+    if isinstance(value, Path):
+        return os.path.abspath(value)
+
+    return str(value)
+
+
+def tool_version(program):
+    path = shutil.which(program)
+    if path is None:
+        return None
+
+    command = VERSION_COMMANDS.get(Path(program).name)
+    if command is None:
+        return path
+
+    try:
+        out = subprocess.run(
+            [path, *command[1:]],
+            capture_output=True,
+            text=True,
+        ).stdout
+    except OSError:
+        return path
+
+    return "\n".join(out.splitlines()[:VERSION_LINES])
+
+
+def remove(path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, value):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as file:
+        json.dump(value, file, indent=2)
+    os.replace(tmp, path)
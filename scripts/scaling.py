@@ -0,0 +1,298 @@
+#! /usr/bin/env python3
+
+# measures how runtime and peak memory grow with the size of the DP
+# matrix, i.e. query length x target length:
+#
+#     scaling.py <benchmark-dir> [--query-lengths 50 200 800]
+#                                [--target-lengths 300 3000 30000 300000]
+#
+# every pair is a benchmark model and a synthetic target of the given
+# length: one of the model's true positives, padded out on both sides with
+# residues from the decoys. The long-seq pairs are added as they are (nail
+# only, since their queries are sequences). Each pair is run, timed and
+# measured on its own, and a power law is fit to each configuration.
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from jobs import SCALING_CONFIGS, Paths, scaling_jobs
+from orchestrate import Scheduler
+from runstate import RunState, read_json, write_json
+from seqindex import fasta_lengths
+
+SCALING_QUERY_LENGTHS = [50, 100, 200, 400, 800]
+# titin, the longest human protein, is ~35k residues
+SCALING_TARGET_LENGTHS = [300, 3000, 30000, 300000]
+
+FASTA_WIDTH = 60
+
+
+def hmm_models(path):
+    # (name, length, text) of every model in an HMM file
+    with open(path) as file:
+        lines = []
+        name = None
+        length = None
+        for line in file:
+            lines.append(line)
+            if line.startswith("NAME"):
+                name = line.split()[1]
+            elif line.startswith("LENG"):
+                length = int(line.split()[1])
+            elif line.startswith("//"):
+                yield (name, length, "".join(lines))
+                lines = []
+
+
+def fasta_sequences(path):
+    # (name, sequence) of every record in a FASTA file
+    with open(path) as file:
+        name = None
+        seq = []
+        for line in file:
+            if line.startswith(">"):
+                if name is not None:
+                    yield (name, "".join(seq))
+                name = line[1:].split()[0]
+                seq = []
+            else:
+                seq.append(line.strip())
+
+        if name is not None:
+            yield (name, "".join(seq))
+
+
+def write_fasta(path, name, seq):
+    with open(path, "w") as file:
+        file.write(f">{name}\n")
+        for i in range(0, len(seq), FASTA_WIDTH):
+            file.write(seq[i:i + FASTA_WIDTH] + "\n")
+
+
+def choose_models(paths, query_lengths):
+    # for each length, the model closest to it that has a true positive
+    families = {
+        name.decode().split("/")[0]
+        for name in fasta_lengths(paths.target).names
+        if not name.startswith(b"decoy")
+    }
+    models = [(n, m) for (n, m, _) in hmm_models(paths.query_hmm)
+              if n in families]
+
+    chosen = {}
+    for length in query_lengths:
+        (name, m) = min(models, key=lambda x: (abs(x[1] - length), x[0]))
+        chosen[name] = m
+
+    return chosen
+
+
+def make_target(positive, decoys, length, rng):
+    # the positive, cropped or padded out to `length` residues with decoy
+    # residues on both sides, at a random offset
+    if len(positive) >= length:
+        start = (len(positive) - length) // 2
+        return positive[start:start + length]
+
+    pad = []
+    pad_length = length - len(positive)
+    while sum(len(p) for p in pad) < pad_length:
+        pad.append(rng.choice(decoys))
+
+    pad = "".join(pad)[:pad_length]
+    left = rng.randint(0, pad_length)
+
+    return pad[:left] + positive + pad[left:]
+
+
+def generate_pairs(paths, query_lengths, target_lengths, pairs_dir, seed=0):
+    rng = random.Random(seed)
+    pairs_dir.mkdir(parents=True, exist_ok=True)
+
+    models = choose_models(paths, query_lengths)
+
+    # one positive per chosen family, and enough decoys to pad with
+    positives = {}
+    decoys = []
+    for (name, seq) in fasta_sequences(paths.target):
+        family = name.split("/")[0]
+        if name.startswith("decoy"):
+            decoys.append(seq)
+        elif family in models and family not in positives:
+            positives[family] = seq
+
+    if not decoys:
+        decoys = list(positives.values())
+
+    pairs = []
+    for (model, text) in ((n, t) for (n, _, t) in hmm_models(paths.query_hmm)
+                          if n in models):
+        query = pairs_dir / f"{model}.hmm"
+        with open(query, "w") as file:
+            file.write(text)
+
+        for length in target_lengths:
+            name = f"{model}-{length}"
+            target = pairs_dir / f"{name}.fa"
+            write_fasta(
+                target,
+                f"{name}",
+                make_target(positives[model], decoys, length, rng),
+            )
+
+            pairs.append({
+                "name": name,
+                "query": str(query),
+                "target": str(target),
+                "query_length": models[model],
+                "target_length": length,
+                "cells": models[model] * length,
+                "hmm": True,
+            })
+
+    return pairs
+
+
+def long_seq_pairs(paths):
+    pairs = []
+    for (i, query, target) in paths.long_seq_pairs():
+        m = int(fasta_lengths(query).lengths.sum())
+        n = int(fasta_lengths(target).lengths.sum())
+        pairs.append({
+            "name": f"long-seq-{i}",
+            "query": str(query),
+            "target": str(target),
+            "query_length": m,
+            "target_length": n,
+            "cells": m * n,
+            "hmm": False,
+        })
+
+    return pairs
+
+
+def read_scaling(scaling_dir):
+    # config -> (cells, seconds, max_rss_kb) arrays, over every finished run
+    pairs = read_json(scaling_dir / "pairs.json") or []
+
+    runs = {}
+    for config in SCALING_CONFIGS:
+        points = []
+        for pair in pairs:
+            record = read_json(scaling_dir / f"{config}/{pair['name']}.rusage.json")
+            if record is None or record["exit_code"] != 0:
+                continue
+            points.append((pair["cells"], record["real"], record["max_rss_kb"]))
+
+        if points:
+            runs[config] = tuple(np.array(c, dtype=np.float64)
+                                 for c in zip(*points))
+
+    return runs
+
+
+def fit_power(x, y):
+    # y = coef * x^exponent, by least squares in log-log space
+    (exponent, log_coef) = np.polyfit(np.log(x), np.log(y), deg=1)
+    return (np.exp(log_coef), exponent)
+
+
+def fit_scaling(runs, memory_limit_kb):
+    # config -> (runs, time exponent, memory exponent, cells at the limit)
+    fits = {}
+    for (config, (cells, seconds, rss)) in runs.items():
+        # a fit needs at least two distinct sizes
+        if len(np.unique(cells)) < 2:
+            continue
+
+        (_, time_exponent) = fit_power(cells, seconds)
+        (coef, memory_exponent) = fit_power(cells, rss)
+
+        # where the fitted peak memory reaches the limit; a flat or
+        # falling fit never does, and a nearly flat one overflows
+        limit_cells = np.nan
+        if memory_exponent > 0 and not np.isclose(memory_exponent, 0):
+            with np.errstate(over="ignore"):
+                limit_cells = (memory_limit_kb / coef) ** (1 / memory_exponent)
+
+        fits[config] = (len(cells), time_exponent, memory_exponent, limit_cells)
+
+    return fits
+
+
+def write_fits(fits, path):
+    with open(path, "w") as file:
+        file.write("config\truns\ttime_exponent\tmemory_exponent\t"
+                   "cells_at_memory_limit\n")
+        for (config, (n, t, m, limit)) in fits.items():
+            file.write(f"{config}\t{n}\t{t:.3f}\t{m:.3f}\t{limit:.3g}\n")
+
+
+def physical_memory_kb():
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="measure runtime and peak memory against query x target "
+        "cells, and fit their empirical complexity")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("--query-lengths", type=int, nargs="+",
+                        default=SCALING_QUERY_LENGTHS)
+    parser.add_argument("--target-lengths", type=int, nargs="+",
+                        default=SCALING_TARGET_LENGTHS)
+    parser.add_argument("--configs", nargs="+", choices=list(SCALING_CONFIGS),
+                        default=list(SCALING_CONFIGS))
+    parser.add_argument("--no-long-seq", action="store_true",
+                        help="leave out the long-seq pairs")
+    parser.add_argument("--memory-limit", type=float,
+                        help="the memory, in GB, to extrapolate the fits to "
+                        "(default: this machine's)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-t", "--threads", type=int, default=1)
+    parser.add_argument("--cores", type=int, default=os.cpu_count())
+    parser.add_argument("--results-dir", type=Path)
+    parser.add_argument("--report", action="store_true",
+                        help="only refit the finished runs")
+    args = parser.parse_args()
+
+    paths = Paths(args.benchmark_dir, args.results_dir)
+    scaling_dir = paths.results("scaling")
+
+    if not args.report:
+        pairs = generate_pairs(paths, args.query_lengths, args.target_lengths,
+                               scaling_dir / "pairs/", args.seed)
+        if not args.no_long_seq:
+            pairs += long_seq_pairs(paths)
+
+        write_json(scaling_dir / "pairs.json", pairs)
+
+        # the runs are compared by runtime, so they never share the machine
+        scheduler = Scheduler(args.cores, exclusive_timed=True,
+                              state=RunState(paths.results_root / ".runs/"))
+        failed = asyncio.run(scheduler.run(
+            scaling_jobs(paths, args.threads, pairs, args.configs)))
+
+        # failures are expected at the large end, e.g. running out of memory
+        if failed:
+            print(f"failed: {', '.join(j.name for j in failed)}")
+
+    if args.memory_limit is None:
+        memory_limit_kb = physical_memory_kb()
+    else:
+        memory_limit_kb = args.memory_limit * 2**20
+
+    fits = fit_scaling(read_scaling(scaling_dir), memory_limit_kb)
+    if not fits:
+        sys.exit("not enough finished runs to fit")
+
+    write_fits(fits, scaling_dir / "fits.tsv")
+
+    with open(scaling_dir / "fits.tsv") as file:
+        print(file.read(), end="")
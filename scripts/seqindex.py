@@ -0,0 +1,155 @@
+import mmap
+import os
+import re
+import zipfile
+
+import numpy as np
+
+# bump this when the on-disk layout of the length index changes
+INDEX_VERSION = 1
+
+FASTA_HEADER = re.compile(rb"^>(\S*)", re.MULTILINE)
+HMM_NAME = re.compile(rb"^NAME\s+(\S+)", re.MULTILINE)
+HMM_LENG = re.compile(rb"^LENG\s+(\d+)", re.MULTILINE)
+
+WHITESPACE = b" \t\r\n"
+
+
+class Lengths:
+    # a name -> length index backed by two arrays sorted by name,
+    # so that whole vocabularies can be looked up in one searchsorted
+    def __init__(self, names, lengths):
+        names = np.asarray(names, dtype=np.bytes_)
+        lengths = np.asarray(lengths, dtype=np.int64)
+
+        order = np.argsort(names, kind="stable")
+        self.names = names[order]
+        self.lengths = lengths[order]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, name):
+        return int(self.lookup([name])[0])
+
+    def __contains__(self, name):
+        idx = np.searchsorted(self.names, np.bytes_(name))
+        return idx < len(self.names) and self.names[idx] == np.bytes_(name)
+
+    def __add__(self, other):
+        return Lengths(
+            np.concatenate([self.names, other.names]),
+            np.concatenate([self.lengths, other.lengths]),
+        )
+
+    def lookup(self, names):
+        keys = np.asarray(names, dtype=np.bytes_)
+        if len(self.names) == 0:
+            if len(keys) > 0:
+                raise KeyError(keys[0].decode())
+
+            return np.zeros(0, dtype=np.int64)
+
+        idx = np.searchsorted(self.names, keys)
+        idx = np.minimum(idx, len(self.names) - 1)
+
+        found = self.names[idx] == keys
+        if not np.all(found):
+            raise KeyError(keys[~found][0].decode())
+
+        return self.lengths[idx]
+
+
+def fasta_lengths(path):
+    return cached_lengths(path, scan_fasta)
+
+
+def hmm_lengths(path):
+    return cached_lengths(path, scan_hmm)
+
+
+def scan_fasta(mm):
+    names = []
+    lengths = []
+
+    def record(name, start, end):
+        # the residues are everything between the end of
+        # the header line and the start of the next header
+        seq_start = mm.find(b"\n", start, end)
+        if seq_start == -1:
+            seq_start = end
+
+        seq = mm[seq_start:end]
+        names.append(name)
+        lengths.append(len(seq) - sum(seq.count(c) for c in WHITESPACE))
+
+    prev = None
+    for match in FASTA_HEADER.finditer(mm):
+        if prev is not None:
+            record(prev.group(1), prev.end(), match.start())
+
+        prev = match
+
+    if prev is not None:
+        record(prev.group(1), prev.end(), len(mm))
+
+    return (names, lengths)
+
+
+def scan_hmm(mm):
+    # every model header has exactly one NAME and one LENG line
+    names = [m.group(1) for m in HMM_NAME.finditer(mm)]
+    lengths = [int(m.group(1)) for m in HMM_LENG.finditer(mm)]
+
+    assert (len(names) == len(lengths))
+
+    return (names, lengths)
+
+
+def scan(path, scanner):
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return ([], [])
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return scanner(mm)
+
+
+def index_path(path):
+    return path.with_name(path.name + ".len.npz")
+
+
+def cached_lengths(path, scanner):
+    # the index is written next to the input, like an easel .ssi
+    # index, and it is rebuilt whenever the input's size or mtime changes
+    stat = path.stat()
+    stamp = np.array(
+        [INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    cache = index_path(path)
+    if cache.exists():
+        try:
+            with np.load(cache) as index:
+                if np.array_equal(index["stamp"], stamp):
+                    return Lengths(index["names"], index["lengths"])
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+
+    (names, lengths) = scan(path, scanner)
+    lengths = Lengths(names, lengths)
+
+    try:
+        tmp = cache.with_name(cache.name + ".tmp")
+        with open(tmp, "wb") as file:
+            np.savez(
+                file,
+                stamp=stamp,
+                names=lengths.names,
+                lengths=lengths.lengths,
+            )
+        os.replace(tmp, cache)
+    except OSError:
+        # a read-only data directory just means we rescan next time
+        pass
+
+    return lengths
@@ -0,0 +1,226 @@
+import heapq
+import json
+import mmap
+import os
+from datetime import datetime
+
+from seqindex import FASTA_HEADER, WHITESPACE
+from timed import write_records
+
+
+def fasta_records(mm):
+    # (start, end, residues) of every record, in file order
+    starts = [m.start() for m in FASTA_HEADER.finditer(mm)]
+    ends = starts[1:] + [len(mm)]
+
+    records = []
+    for (start, end) in zip(starts, ends):
+        seq_start = mm.find(b"\n", start, end)
+        if seq_start == -1:
+            seq_start = end
+
+        seq = mm[seq_start:end]
+        residues = len(seq) - sum(seq.count(c) for c in WHITESPACE)
+        records.append((start, end, residues))
+
+    return records
+
+
+def balance(residues, count):
+    # longest first, each onto the shard with the fewest residues so far;
+    # ties go to the lowest shard, so the split is deterministic
+    heap = [(0, k) for k in range(count)]
+    owner = [0] * len(residues)
+
+    for i in sorted(range(len(residues)), key=lambda i: (-residues[i], i)):
+        (total, k) = heapq.heappop(heap)
+        owner[i] = k
+        heapq.heappush(heap, (total + residues[i], k))
+
+    return owner
+
+
+def shard_path(shard_dir, k):
+    return shard_dir / f"{k}.fa"
+
+
+def manifest_path(shard_dir):
+    return shard_dir / "shards.json"
+
+
+def split_fasta(path, count, shard_dir):
+    # split a FASTA file into `count` shards with about the same number
+    # of residues each; every shard keeps its records in file order
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            records = fasta_records(mm)
+            owner = balance([r[2] for r in records], count)
+
+            sequences = [0] * count
+            residues = [0] * count
+            shards = [open(shard_path(shard_dir, k), "wb") for k in range(count)]
+            try:
+                for ((start, end, n), k) in zip(records, owner):
+                    shards[k].write(mm[start:end])
+                    sequences[k] += 1
+                    residues[k] += n
+            finally:
+                for shard in shards:
+                    shard.close()
+
+    manifest = {
+        "count": count,
+        "sequences": sequences,
+        "residues": residues,
+        "total_sequences": sum(sequences),
+        "total_residues": sum(residues),
+    }
+
+    tmp = manifest_path(shard_dir).with_name("shards.json.tmp")
+    with open(tmp, "w") as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(tmp, manifest_path(shard_dir))
+
+
+def read_manifest(shard_dir):
+    with open(manifest_path(shard_dir)) as file:
+        return json.load(file)
+
+
+def sequence_scales(manifest):
+    # for tools whose E-values scale with the number of target sequences
+    return [manifest["total_sequences"] / max(n, 1)
+            for n in manifest["sequences"]]
+
+
+def residue_scales(manifest):
+    # for tools whose E-values scale with the number of target residues
+    return [manifest["total_residues"] / max(n, 1)
+            for n in manifest["residues"]]
+
+
+def merge_tables(paths, scales, column, out):
+    # concatenate per-shard tables, scaling the E-values in `column`
+    # from each shard's database size up to the whole database's
+    with open(out, "w") as out_file:
+        for (path, scale) in zip(paths, scales):
+            with open(path) as file:
+                for line in file:
+                    if line.startswith("#"):
+                        continue
+
+                    tokens = line.split()
+                    if len(tokens) <= column:
+                        continue
+
+                    tokens[column] = f"{float(tokens[column]) * scale:.6g}"
+                    out_file.write("\t".join(tokens) + "\n")
+
+
+def merge_tblout(paths, out):
+    # hmmer's per-sequence E-values already are the whole database's (via
+    # -Z), so the tables are just concatenated; the header comes from the
+    # first shard
+    with open(out, "w") as out_file:
+        for (i, path) in enumerate(paths):
+            with open(path) as file:
+                for line in file:
+                    if line.startswith("#") and i > 0:
+                        continue
+                    out_file.write(line)
+
+
+# the query name and the conditional and independent E-values
+# of a --domtblout line, which has 23 fields, the last of them
+# a free-text description
+DOMTBL_QUERY = 3
+DOMTBL_EVALUES = [11, 12]
+DOMTBL_FIELDS = 23
+
+
+def reported_counts(tbl_path):
+    # query -> how many target sequences hmmer reported for it, according
+    # to a --tblout table; that's the domZ of the query's domain E-values
+    counts = {}
+    with open(tbl_path) as file:
+        for line in file:
+            if line.startswith("#"):
+                continue
+            tokens = line.split()
+            if len(tokens) > 2:
+                counts[tokens[2]] = counts.get(tokens[2], 0) + 1
+
+    return counts
+
+
+def merge_domtblout(paths, tbl_paths, out):
+    # hmmer's domain E-values are computed with domZ rather than -Z, i.e.
+    # with the number of sequences each shard reported for the query. With
+    # -Z, a sequence is reported in its shard iff it would have been in the
+    # whole database, so the whole database's domZ is the sum of the
+    # shards', and each shard's domain E-values are scaled up to it.
+    shard_counts = [reported_counts(p) for p in tbl_paths]
+    totals = {}
+    for counts in shard_counts:
+        for (query, n) in counts.items():
+            totals[query] = totals.get(query, 0) + n
+
+    with open(out, "w") as out_file:
+        for (i, (path, counts)) in enumerate(zip(paths, shard_counts)):
+            with open(path) as file:
+                for line in file:
+                    if line.startswith("#"):
+                        if i == 0:
+                            out_file.write(line)
+                        continue
+
+                    tokens = line.split(None, DOMTBL_FIELDS - 1)
+                    if len(tokens) < DOMTBL_FIELDS:
+                        continue
+
+                    query = tokens[DOMTBL_QUERY]
+                    if query not in counts:
+                        # its domZ is unknown, so its E-values can't be fixed
+                        raise ValueError(
+                            f"{path}: {query} has domain hits, but no "
+                            f"sequence hits in {tbl_paths[i]}")
+
+                    scale = totals[query] / counts[query]
+                    for column in DOMTBL_EVALUES:
+                        tokens[column] = f"{float(tokens[column]) * scale:.6g}"
+
+                    out_file.write(" ".join(tokens).rstrip("\n") + "\n")
+
+
+def merge_times(paths, out):
+    # the shards ran as separate jobs: the merged run's wall time is from
+    # the first shard's start to the last one's end, its CPU time and
+    # counters are their sums, and its peak memory is the largest shard's
+    records = []
+    for path in paths:
+        with open(path.with_name(path.stem + ".rusage.json")) as file:
+            records.append(json.load(file))
+
+    starts = [datetime.fromisoformat(r["started_at"]).timestamp()
+              for r in records]
+    ends = [s + r["real"] for (s, r) in zip(starts, records)]
+
+    merged = {
+        "command": [r["command"] for r in records],
+        "started_at": min(records, key=lambda r: r["started_at"])["started_at"],
+        "exit_code": max((r["exit_code"] for r in records), key=abs),
+        "real": max(ends) - min(starts),
+        "shards": len(records),
+    }
+
+    for name in ["user", "sys", "cpu", "minor_faults", "major_faults",
+                 "voluntary_context_switches", "involuntary_context_switches",
+                 "block_input_ops", "block_output_ops"]:
+        merged[name] = sum(r[name] for r in records)
+
+    merged["max_rss_kb"] = max(r["max_rss_kb"] for r in records)
+    merged["page_size"] = records[0]["page_size"]
+
+    write_records(merged, str(out))
@@ -0,0 +1,277 @@
+#! /usr/bin/env python3
+
+# an index of the families in a multi-alignment Stockholm file (e.g.
+# Pfam-A.seed), for fetching any subset of them without rescanning it:
+#
+#     stoindex.py data/pfam.sto -n 100 --seed 1 > subset.sto
+#     stoindex.py data/pfam.sto -f names.txt -o subset.sto
+#     stoindex.py data/pfam.sto PF00001 Kazal_1 > subset.sto
+#     stoindex.py data/pfam.sto --list
+#
+# the index is built in one pass and kept next to the file, like an easel
+# .ssi index, with every family's name, accession, byte offset and length,
+# number of sequences and alignment width. A plain file is fetched from as
+# slices of a memory map. A gzipped file (e.g. the Pfam-A.seed.gz download)
+# is read once and rewritten as a blocked gzip, <name>.bgz, where every
+# family is its own gzip member, so that each one can be read and
+# decompressed on its own.
+
+import argparse
+import gzip
+import mmap
+import os
+import random
+import re
+import sys
+import zipfile
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+# bump this when the on-disk layout of the index changes
+INDEX_VERSION = 1
+
+# how much of a gzipped file is decompressed at a time while indexing
+GZIP_CHUNK = 16 << 20
+
+RECORD_END = re.compile(rb"^//[ \t\r]*(?:\n|$)", re.MULTILINE)
+GF_ID = re.compile(rb"^#=GF\s+ID\s+(\S+)", re.MULTILINE)
+GF_AC = re.compile(rb"^#=GF\s+AC\s+(\S+)", re.MULTILINE)
+SEQ_LINE = re.compile(rb"^([^#/\s]\S*)[ \t]+(\S+)", re.MULTILINE)
+
+
+class StockholmIndex:
+    # one entry per family, in file order; offsets and lengths are into
+    # `data`, which is the file itself, or its blocked gzip copy
+    def __init__(self, data, names, accessions, offsets, lengths,
+                 sequences, widths):
+        self.data = data
+        self.compressed = data.suffix == ".bgz"
+        self.names = np.asarray(names, dtype=np.bytes_)
+        self.accessions = np.asarray(accessions, dtype=np.bytes_)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int64)
+        self.sequences = np.asarray(sequences, dtype=np.int64)
+        self.widths = np.asarray(widths, dtype=np.int64)
+
+        # families can be asked for by name, accession, or
+        # accession without its version (PF00001 for PF00001.23)
+        self.positions = {}
+        for (i, (name, acc)) in enumerate(zip(self.names, self.accessions)):
+            for key in [name, acc, acc.split(b".")[0]]:
+                if key:
+                    self.positions.setdefault(key.decode(), i)
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, keys):
+        positions = []
+        for key in keys:
+            if key not in self.positions:
+                raise KeyError(key)
+            positions.append(self.positions[key])
+
+        return positions
+
+    def fetch(self, keys, out):
+        # write the families to `out` (a binary file) in the order asked for
+        positions = self.lookup(keys)
+
+        with open(self.data, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    for i in positions:
+                        start = self.offsets[i]
+                        with view[start:start + self.lengths[i]] as piece:
+                            if self.compressed:
+                                out.write(zlib.decompress(piece, wbits=31))
+                            else:
+                                out.write(piece)
+
+
+def record_entry(record, offset, length):
+    # (name, accession, offset, length, sequences, width) of one alignment
+    name = GF_ID.search(record)
+    accession = GF_AC.search(record)
+
+    # sequences can be split over several blocks, so they're counted by
+    # name and the width is the total length of the first one's pieces
+    seen = set()
+    first = None
+    width = 0
+    for match in SEQ_LINE.finditer(record):
+        seq_name = match.group(1)
+        seen.add(seq_name)
+        if first is None:
+            first = seq_name
+        if seq_name == first:
+            width += len(match.group(2))
+
+    return (
+        name.group(1) if name else b"",
+        accession.group(1) if accession else b"",
+        offset,
+        length,
+        len(seen),
+        width,
+    )
+
+
+def record_bounds(buffer, start=0):
+    # (start, end) of each complete record in buffer, from `start` on
+    for match in RECORD_END.finditer(buffer, start):
+        yield (start, match.end())
+        start = match.end()
+
+
+def scan_plain(path):
+    entries = []
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return (path, entries)
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for (start, end) in record_bounds(mm):
+                entries.append(record_entry(mm[start:end], start, end - start))
+
+    return (path, entries)
+
+
+def scan_gzip(path):
+    # a single pass over the decompressed stream, which writes each family
+    # out as its own gzip member of the blocked copy
+    data = blocked_path(path)
+    tmp = data.with_name(data.name + ".tmp")
+
+    entries = []
+    offset = 0
+    with gzip.open(path, "rb") as file, open(tmp, "wb") as out:
+        buffer = b""
+        while True:
+            chunk = file.read(GZIP_CHUNK)
+            buffer += chunk
+
+            consumed = 0
+            for (start, end) in record_bounds(buffer):
+                record = buffer[start:end]
+                member = gzip.compress(record, mtime=0)
+                out.write(member)
+
+                entries.append(record_entry(record, offset, len(member)))
+                offset += len(member)
+                consumed = end
+
+            buffer = buffer[consumed:]
+            if not chunk:
+                break
+
+    os.replace(tmp, data)
+
+    return (data, entries)
+
+
+def blocked_path(path):
+    return path.with_suffix(".bgz")
+
+
+def index_path(path):
+    return path.with_name(path.name + ".idx.npz")
+
+
+def stockholm_index(path):
+    # the index is rebuilt whenever the file's size or mtime changes
+    stat = path.stat()
+    stamp = np.array(
+        [INDEX_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+    gzipped = path.suffix == ".gz"
+
+    cache = index_path(path)
+    if cache.exists():
+        try:
+            with np.load(cache) as index:
+                data = blocked_path(path) if gzipped else path
+                if np.array_equal(index["stamp"], stamp) and data.exists():
+                    return StockholmIndex(
+                        data,
+                        *(index[k] for k in ["names", "accessions", "offsets",
+                                             "lengths", "sequences", "widths"]),
+                    )
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            pass
+
+    (data, entries) = scan_gzip(path) if gzipped else scan_plain(path)
+    columns = list(zip(*entries)) or [[]] * 6
+    index = StockholmIndex(data, *columns)
+
+    try:
+        tmp = cache.with_name(cache.name + ".tmp")
+        with open(tmp, "wb") as file:
+            np.savez(
+                file,
+                stamp=stamp,
+                names=index.names,
+                accessions=index.accessions,
+                offsets=index.offsets,
+                lengths=index.lengths,
+                sequences=index.sequences,
+                widths=index.widths,
+            )
+        os.replace(tmp, cache)
+    except OSError:
+        # a read-only data directory just means we rescan next time
+        pass
+
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="fetch families from a (gzipped) Stockholm file through "
+        "an index of their byte offsets")
+    parser.add_argument("stockholm", type=Path)
+    parser.add_argument("families", nargs="*",
+                        help="names or accessions of the families to fetch")
+    parser.add_argument("-f", "--file", type=Path,
+                        help="a file of family names or accessions, one per line")
+    parser.add_argument("-n", "--sample", type=int,
+                        help="fetch this many families, chosen at random")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-o", "--output", type=Path,
+                        help="where to write the families (default: stdout)")
+    parser.add_argument("--list", action="store_true",
+                        help="print the index instead of fetching")
+    args = parser.parse_args()
+
+    index = stockholm_index(args.stockholm)
+
+    if args.list:
+        print("name\taccession\toffset\tlength\tsequences\twidth")
+        for i in range(len(index)):
+            print(f"{index.names[i].decode()}\t{index.accessions[i].decode()}\t"
+                  f"{index.offsets[i]}\t{index.lengths[i]}\t"
+                  f"{index.sequences[i]}\t{index.widths[i]}")
+        sys.exit()
+
+    families = list(args.families)
+    if args.file is not None:
+        with open(args.file) as file:
+            families += [line.strip() for line in file if line.strip()]
+
+    if args.sample is not None:
+        names = [n.decode() for n in index.names]
+        families += random.Random(args.seed).sample(names, args.sample)
+
+    if not families:
+        parser.error("no families given")
+
+    try:
+        if args.output is None:
+            index.fetch(families, sys.stdout.buffer)
+        else:
+            with open(args.output, "wb") as out:
+                index.fetch(families, out)
+    except KeyError as e:
+        sys.exit(f"no family {e} in {args.stockholm}")
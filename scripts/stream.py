@@ -0,0 +1,131 @@
+import heapq
+from itertools import islice
+
+import numpy as np
+
+from hits import Roc, classify, hits_name, parse_lines
+
+# streaming evaluation only ever holds this many result
+# lines (plus the true positives found so far) in memory
+STREAM_CHUNK_LINES = 1 << 16
+
+
+class StreamedHits:
+    # the recall curve of one result file, evaluated online and only
+    # as far as the false positive budget; it stands in for Hits
+    # wherever only recall_vs_mean_false() is needed
+    def __init__(self, name, roc):
+        self.name = name
+        self.roc = roc
+
+        self._recall_cache = {}
+
+    def recall_vs_mean_false(self, num_true_positives, num_queries):
+        key = (num_true_positives, num_queries)
+        if key not in self._recall_cache:
+            self._recall_cache[key] = self.roc.recall_vs_mean_false(
+                num_true_positives, num_queries)
+
+        return self._recall_cache[key]
+
+
+class OnlineRoc:
+    # keeps every true positive, but only the `budget` best false
+    # positives, so memory grows with the number of true positives
+    def __init__(self, budget):
+        self.budget = budget
+
+        # (query, target) -> best true positive E-value
+        self.true_positives = {}
+        # a max-heap (by negated E-value) of the best false positives
+        self.false_positives = []
+
+    def full(self):
+        return len(self.false_positives) >= self.budget
+
+    def threshold(self):
+        # the E-value past which nothing can change the curve
+        if not self.full():
+            return np.inf
+
+        return -self.false_positives[0]
+
+    def update(self, keys, true_evalue, false_evalue):
+        for (key, evalue) in zip(keys, true_evalue.tolist()):
+            # like classify_hits(), only keep the best
+            # true positive per (query, target)
+            best = self.true_positives.get(key, evalue)
+            self.true_positives[key] = min(best, evalue)
+
+        for evalue in false_evalue.tolist():
+            if not self.full():
+                heapq.heappush(self.false_positives, -evalue)
+            elif evalue < self.threshold():
+                heapq.heapreplace(self.false_positives, -evalue)
+
+    def roc(self):
+        # true positives tie-break ahead of false positives, so
+        # those at exactly the threshold are still on the curve
+        threshold = self.threshold()
+        true_evalue = np.array(
+            [e for e in self.true_positives.values() if e <= threshold],
+            dtype=np.float64
+        )
+        false_evalue = -np.array(self.false_positives, dtype=np.float64)
+
+        return Roc(np.sort(true_evalue), np.sort(false_evalue))
+
+
+def table_chunks(path, cols, chunk_lines=STREAM_CHUNK_LINES):
+    with open(path) as file:
+        while True:
+            lines = list(islice(file, chunk_lines))
+            if not lines:
+                return
+
+            yield parse_lines(iter(lines), cols)
+
+
+def labelled_chunks(tables, cols):
+    # classify each chunk on its own, and pass only the true and false
+    # positives on; a chunk's own name vocabularies are all it needs
+    for table in tables:
+        (true_positive, false_positive) = classify(table, cols)
+
+        keys = zip(
+            table.query_name[true_positive].tolist(),
+            table.target_name[true_positive].tolist(),
+        )
+
+        yield (
+            keys,
+            table.evalue[true_positive],
+            table.evalue[false_positive],
+            table.evalue,
+        )
+
+
+def stream_hits(path, cols, budget, sorted_input=False):
+    name = hits_name(path)
+    online = OnlineRoc(budget)
+
+    chunks = labelled_chunks(table_chunks(path, cols), cols)
+    for (keys, true_evalue, false_evalue, evalue) in chunks:
+        threshold = online.threshold()
+        online.update(
+            keys,
+            true_evalue[true_evalue <= threshold],
+            false_evalue[false_evalue < threshold],
+        )
+
+        # in E-value sorted input, once the budget is used up
+        # nothing after the current threshold can be on the curve
+        if (sorted_input and online.full() and len(evalue) > 0
+                and evalue[-1] > online.threshold()):
+            break
+
+    return StreamedHits(name, online.roc())
+
+
+def stream_results(paths, cols, budget, sorted_input=False):
+    return [stream_hits(p, cols, budget, sorted_input) for p in sorted(paths)]
@@ -0,0 +1,231 @@
+#! /usr/bin/env python3
+
+# sweeps nail's filter parameters and reports the runtime / sensitivity
+# trade-off of every point:
+#
+#     sweep.py <benchmark-dir> [--spec sweep.json] [--mode random --budget 20]
+#
+# a spec maps each nail flag to the values to try, e.g.
+#
+#     {"--mmseqs-k-score": [60, 80, 100], "--forward-thresh": [null, 1e-2]}
+#
+# where null leaves the flag to nail's default. In random mode, a flag can
+# also be given a range, {"min": 1e-4, "max": 1e-1, "log": true}, to draw
+# from. Every point is a resumable job (see orchestrate.py), so growing a
+# sweep only runs the new points.
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+from pathlib import Path
+
+from hitcache import HitCache
+from jobs import NAIL_PARAMS, Paths, sweep_jobs
+from orchestrate import Scheduler
+from plots import Benchmark, Time, nail_results
+from runstate import RunState, read_json, write_json
+
+SWEEP_MODES = ["grid", "random"]
+
+# the default sweep: the mmseqs prefilter settings
+# around the ones run-nail.sh uses, and nail's own filters
+DEFAULT_SPEC = {
+    "--mmseqs-k": [5, 6, 7],
+    "--mmseqs-k-score": [60, 80, 100, 120],
+    "--mmseqs-min-ungapped_score": [10, 15, 20],
+    "--mmseqs-max-seqs": [300, 1000, 3000],
+    "--forward-thresh": [None, 1e-3, 1e-1, 1e9],
+    "--cloud-thresh": [None, 1e-3, 1e-1, 1e9],
+}
+
+# the columns of the sweep table, after the parameters
+SWEEP_COLUMNS = ["runtime", "cpu", "recall", "pareto"]
+
+
+def point_id(params):
+    key = json.dumps(params, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:10]
+
+
+def grid_points(spec, budget=None, seed=0):
+    flags = list(spec)
+    for (flag, values) in spec.items():
+        if not isinstance(values, list):
+            raise SystemExit(f"{flag}: a grid sweep needs a list of values")
+
+    points = [dict(zip(flags, values))
+              for values in itertools.product(*spec.values())]
+
+    # a grid that's larger than the budget is sampled
+    if budget is not None and budget < len(points):
+        points = random.Random(seed).sample(points, budget)
+
+    return points
+
+
+def random_points(spec, budget, seed=0):
+    rng = random.Random(seed)
+
+    def draw(values):
+        if isinstance(values, list):
+            return rng.choice(values)
+
+        (lo, hi) = (values["min"], values["max"])
+        if values.get("log", False):
+            return float(f"{10 ** rng.uniform(math.log10(lo), math.log10(hi)):.3g}")
+        if isinstance(lo, int) and isinstance(hi, int):
+            return rng.randint(lo, hi)
+        return float(f"{rng.uniform(lo, hi):.3g}")
+
+    # draws are repeated until there are `budget` distinct points,
+    # or it looks like the space doesn't have that many
+    points = {}
+    for _ in range(budget * 100):
+        if len(points) == budget:
+            break
+
+        params = {flag: draw(values) for (flag, values) in spec.items()}
+        points.setdefault(point_id(params), params)
+
+    return list(points.values())
+
+
+def pareto(runtime, recall):
+    # a point is on the frontier if every faster point finds less
+    order = sorted(range(len(runtime)), key=lambda i: (runtime[i], -recall[i]))
+
+    frontier = [False] * len(runtime)
+    best = -1.0
+    for i in order:
+        if recall[i] > best:
+            frontier[i] = True
+            best = recall[i]
+
+    return frontier
+
+
+def read_points(sweep_dir):
+    # every point that has been swept so far: id -> parameters
+    return read_json(sweep_dir / "points.json") or {}
+
+
+def evaluate(benchmark, sweep_dir, cache):
+    # (id, parameters, runtime, cpu, recall) for every finished point
+    (_, cols) = nail_results(sweep_dir)
+
+    rows = []
+    for (pid, params) in read_points(sweep_dir).items():
+        tsv = sweep_dir / f"points/{pid}.tsv"
+        time = sweep_dir / f"points/{pid}.time"
+        if not (tsv.exists() and time.exists()):
+            continue
+
+        hits = cache.load(tsv, cols)
+        recall = hits.recall_vs_mean_false(
+            benchmark.num_true_positives, benchmark.num_queries)[2]
+
+        t = Time(time)
+        rows.append((pid, params, t.seconds, t.cpu_seconds, float(recall)))
+
+    return rows
+
+
+def param_str(value):
+    # flags left out of a spec run with the value in NAIL_PARAMS
+    if value is None:
+        return "default"
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def write_table(rows, path):
+    flags = sorted({f for (_, params, *_) in rows for f in params})
+    frontier = pareto([r[2] for r in rows], [r[4] for r in rows])
+
+    order = sorted(range(len(rows)), key=lambda i: rows[i][2])
+
+    with open(path, "w") as file:
+        file.write("\t".join(["id", *flags, *SWEEP_COLUMNS]) + "\n")
+        for i in order:
+            (pid, params, runtime, cpu, recall) = rows[i]
+            values = [param_str(params.get(f, NAIL_PARAMS.get(f)))
+                      for f in flags]
+            file.write("\t".join([
+                pid,
+                *values,
+                f"{runtime:.2f}",
+                f"{cpu:.2f}",
+                f"{recall:.4f}",
+                "*" if frontier[i] else "",
+            ]) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="sweep nail's filter parameters and report the "
+        "runtime / recall Pareto frontier")
+    parser.add_argument("benchmark_dir", type=Path)
+    parser.add_argument("--spec", type=Path,
+                        help="a JSON file of flag -> values "
+                        "(default: the mmseqs prefilter and nail filters)")
+    parser.add_argument("--mode", choices=SWEEP_MODES, default="grid")
+    parser.add_argument("--budget", type=int, default=32,
+                        help="the most points to run; a larger grid is "
+                        "sampled (default: 32)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-t", "--threads", type=int, default=1)
+    parser.add_argument("--cores", type=int, default=os.cpu_count())
+    parser.add_argument("--results-dir", type=Path)
+    parser.add_argument("--report", action="store_true",
+                        help="only rebuild the table from the finished points")
+    args = parser.parse_args()
+
+    paths = Paths(args.benchmark_dir, args.results_dir)
+    sweep_dir = paths.results("sweep")
+
+    if not args.report:
+        spec = DEFAULT_SPEC
+        if args.spec is not None:
+            with open(args.spec) as file:
+                spec = json.load(file)
+
+        if args.mode == "random":
+            params = random_points(spec, args.budget, args.seed)
+        else:
+            params = grid_points(spec, args.budget, args.seed)
+
+        points = {point_id(p): p for p in params}
+        write_json(sweep_dir / "points.json",
+                   {**read_points(sweep_dir), **points})
+
+        # the points are compared by runtime, so they never share the machine
+        scheduler = Scheduler(args.cores, exclusive_timed=True,
+                              state=RunState(paths.results_root / ".runs/"))
+        failed = asyncio.run(
+            scheduler.run(sweep_jobs(paths, args.threads, points)))
+
+        if failed:
+            print(f"failed: {', '.join(j.name for j in failed)}")
+
+    benchmark = Benchmark(args.benchmark_dir)
+    rows = evaluate(benchmark, sweep_dir,
+                    HitCache(paths.results_root / ".cache"))
+
+    if not rows:
+        sys.exit("no finished sweep points")
+
+    # the table has every point, but only the frontier is worth printing
+    write_table(rows, sweep_dir / "sweep.tsv")
+
+    with open(sweep_dir / "sweep.tsv") as file:
+        print(file.readline(), end="")
+        for line in file:
+            if line.rstrip("\n").endswith("*"):
+                print(line, end="")
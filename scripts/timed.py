@@ -0,0 +1,134 @@
+#! /usr/bin/env python3
+
+# a drop-in replacement for `/usr/bin/time -p -o <file>` that also keeps
+# the child's full resource usage:
+#
+#     timed.py -o <name>.time <command> [args...]
+#
+# writes <name>.time in the same `real/user/sys` format as `time -p`,
+# and a structured record of the run to <name>.rusage.json. With
+# --sample <seconds>, the run's process tree is also sampled that often
+# into <name>.timeline.tsv (see timeline.py).
+
+import argparse
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from timeline import Sampler, timeline_path
+
+
+def rusage_path(time_path):
+    name = time_path
+    if name.endswith(".time"):
+        name = name[:-len(".time")]
+
+    return name + ".rusage.json"
+
+
+def evict(paths):
+    # drop files from the page cache, so that the next run has to read
+    # them from disk; only clean pages can be dropped, so dirty ones
+    # are written back first
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+
+        try:
+            os.fdatasync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def run(command, sample=None, timeline=None):
+    started_at = datetime.now(timezone.utc).isoformat()
+    start = time.monotonic()
+
+    try:
+        child = subprocess.Popen(command)
+    except OSError as e:
+        sys.exit(f"timed.py: cannot run {command[0]}: {e.strerror}")
+
+    sampler = None
+    if sample is not None:
+        sampler = Sampler(child.pid, sample, timeline)
+        sampler.start()
+
+    # like time(1), leave interrupts to the child while we wait on it
+    handlers = {
+        s: signal.signal(s, signal.SIG_IGN)
+        for s in (signal.SIGINT, signal.SIGQUIT)
+    }
+
+    try:
+        (_, status, usage) = os.wait4(child.pid, 0)
+    finally:
+        for (s, handler) in handlers.items():
+            signal.signal(s, handler)
+
+    real = time.monotonic() - start
+
+    if sampler is not None:
+        sampler.stop()
+
+    # the child's rusage also covers every descendant it waited on,
+    # which matters for tools like nail and mmseqs that spawn workers
+    return {
+        "command": command,
+        "started_at": started_at,
+        "exit_code": os.waitstatus_to_exitcode(status),
+        "real": real,
+        "user": usage.ru_utime,
+        "sys": usage.ru_stime,
+        "cpu": usage.ru_utime + usage.ru_stime,
+        # kilobytes on linux
+        "max_rss_kb": usage.ru_maxrss,
+        "minor_faults": usage.ru_minflt,
+        "major_faults": usage.ru_majflt,
+        "voluntary_context_switches": usage.ru_nvcsw,
+        "involuntary_context_switches": usage.ru_nivcsw,
+        "block_input_ops": usage.ru_inblock,
+        "block_output_ops": usage.ru_oublock,
+        "page_size": resource.getpagesize(),
+    }
+
+
+def write_records(record, time_path):
+    with open(time_path, "w") as file:
+        file.write(f"real {record['real']:.2f}\n")
+        file.write(f"user {record['user']:.2f}\n")
+        file.write(f"sys {record['sys']:.2f}\n")
+
+    with open(rusage_path(time_path), "w") as file:
+        json.dump(record, file, indent=2)
+        file.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="run a command and record its resource usage")
+    parser.add_argument("-o", "--output", required=True,
+                        help="the .time file to write")
+    parser.add_argument("--sample", type=float, metavar="SECONDS",
+                        help="sample the command's process tree this often, "
+                        "into a .timeline.tsv next to the .time file")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.error("no command given")
+
+    record = run(args.command, args.sample, timeline_path(args.output))
+    write_records(record, args.output)
+
+    sys.exit(record["exit_code"])
@@ -0,0 +1,264 @@
+#! /usr/bin/env python3
+
+# samples the resource usage of a running command's whole process tree
+# from /proc, so that a run's phases (e.g. nail's prefilter, cloud search
+# and forward/backward, or mmseqs' prefilter and align steps) show up as
+# they happen rather than as end-of-run totals:
+#
+#     timed.py -o <name>.time --sample 0.5 <command> [args...]
+#
+# writes <name>.timeline.tsv next to the .time file, with one row per
+# sample. To draw a timeline:
+#
+#     timeline.py <name>.timeline.tsv [...]
+#
+# which writes <name>.timeline.pdf next to each table.
+
+import argparse
+import os
+import threading
+import time
+from pathlib import Path
+
+TIMELINE_COLUMNS = [
+    # since the command started
+    "seconds",
+    # CPU time per second since the last sample, i.e. busy cores
+    "cpu",
+    "rss_kb",
+    "processes",
+    "threads",
+    # threads that were on a CPU or waiting for one
+    "running",
+    # cumulative bytes that went to or came from storage
+    "read_bytes",
+    "write_bytes",
+]
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def timeline_path(time_path):
+    name = str(time_path)
+    if name.endswith(".time"):
+        name = name[:-len(".time")]
+
+    return Path(name + ".timeline.tsv")
+
+
+def read_stat(pid):
+    # (ppid, cpu ticks, threads, rss pages) from /proc/<pid>/stat; the
+    # command name can have spaces in it, so fields are counted from the
+    # closing parenthesis
+    with open(f"/proc/{pid}/stat") as file:
+        fields = file.read().rsplit(")", 1)[1].split()
+
+    return (int(fields[1]), int(fields[11]) + int(fields[12]),
+            int(fields[17]), int(fields[21]))
+
+
+def read_io(pid):
+    # (read_bytes, write_bytes), or zeros if we're not allowed to look
+    try:
+        with open(f"/proc/{pid}/io") as file:
+            fields = dict(line.split(": ") for line in file)
+    except OSError:
+        return (0, 0)
+
+    return (int(fields["read_bytes"]), int(fields["write_bytes"]))
+
+
+def running_threads(pid):
+    running = 0
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return 0
+
+    for task in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{task}/stat") as file:
+                state = file.read().rsplit(")", 1)[1].split()[0]
+        except OSError:
+            continue
+        if state == "R":
+            running += 1
+
+    return running
+
+
+def process_tree(root):
+    # the pids of root and all of its descendants
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            (ppid, *_) = read_stat(name)
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    tree = [root]
+    for pid in tree:
+        tree.extend(children.get(pid, []))
+
+    return tree
+
+
+class Sampler:
+    # samples the process tree under `pid` every `interval` seconds on a
+    # background thread, until stopped, and writes the samples to `path`
+    def __init__(self, pid, interval, path):
+        self.pid = pid
+        self.interval = interval
+        self.path = path
+        self.start_time = time.monotonic()
+        self.stopped = threading.Event()
+        self.rows = []
+
+        # the last counters seen for each process; processes come and go,
+        # so the totals are built up from each live process' increments
+        self.last = {}
+        self.last_time = self.start_time
+        self.read_bytes = 0
+        self.write_bytes = 0
+
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
+
+    def loop(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        now = time.monotonic()
+
+        counters = {}
+        (rss, threads, running) = (0, 0, 0)
+        for pid in process_tree(self.pid):
+            try:
+                (_, ticks, n, pages) = read_stat(pid)
+            except (OSError, IndexError, ValueError):
+                # it exited while we were looking
+                continue
+
+            counters[pid] = (ticks, *read_io(pid))
+            rss += pages * PAGE_KB
+            threads += n
+            running += running_threads(pid)
+
+        if not counters:
+            return
+
+        # a process that's new since the last sample counts in full
+        ticks = 0
+        for (pid, (t, r, w)) in counters.items():
+            (t0, r0, w0) = self.last.get(pid, (0, 0, 0))
+            ticks += max(t - t0, 0)
+            self.read_bytes += max(r - r0, 0)
+            self.write_bytes += max(w - w0, 0)
+
+        cpu = ticks / CLOCK_TICKS / max(now - self.last_time, 1e-9)
+
+        self.last = counters
+        self.last_time = now
+
+        self.rows.append((now - self.start_time, cpu, rss, len(counters),
+                          threads, running, self.read_bytes, self.write_bytes))
+
+    def write(self):
+        with open(self.path, "w") as file:
+            file.write(f"# interval {self.interval}\n")
+            file.write("\t".join(TIMELINE_COLUMNS) + "\n")
+            for row in self.rows:
+                (seconds, cpu, *counts) = row
+                file.write("\t".join(
+                    [f"{seconds:.2f}", f"{cpu:.2f}", *map(str, counts)]) + "\n")
+
+
+def read_timeline(path):
+    # column -> list of values
+    with open(path) as file:
+        lines = [line for line in file if not line.startswith("#")]
+
+    header = lines[0].rstrip("\n").split("\t")
+    columns = {c: [] for c in header}
+    for line in lines[1:]:
+        for (c, value) in zip(header, line.split()):
+            columns[c].append(float(value))
+
+    return columns
+
+
+def plot_timeline(path, out=None):
+    import matplotlib.pyplot as plt
+
+    if out is None:
+        out = path.with_name(path.name[:-len(".tsv")] + ".pdf")
+
+    columns = read_timeline(path)
+    seconds = columns["seconds"]
+
+    # the I/O counters are cumulative; plot their rate between samples
+    def rate(c):
+        values = columns[c]
+        return [
+            (b - a) / 2**20 / max(t1 - t0, 1e-9)
+            for (a, b, t0, t1) in zip([0] + values, values, [0] + seconds, seconds)
+        ]
+
+    (fig, axes) = plt.subplots(4, 1, sharex=True, figsize=(10, 9))
+
+    axes[0].plot(seconds, columns["cpu"], color="#1E88E5")
+    axes[0].set_ylabel("Busy Cores")
+
+    axes[1].plot(seconds, [kb / 2**20 for kb in columns["rss_kb"]],
+                 color="#D81B60")
+    axes[1].set_ylabel("RSS (GB)")
+
+    axes[2].plot(seconds, rate("read_bytes"), color="#004D40", label="read")
+    axes[2].plot(seconds, rate("write_bytes"), color="#FFC107", label="write")
+    axes[2].set_ylabel("I/O (MB/s)")
+    axes[2].legend(loc="upper right")
+
+    axes[3].plot(seconds, columns["threads"], color="gray", label="threads")
+    axes[3].plot(seconds, columns["running"], color="#1E88E5",
+                 label="running")
+    axes[3].set_ylabel("Threads")
+    axes[3].legend(loc="upper right")
+    axes[3].set_xlabel("Time (sec)")
+
+    for ax in axes:
+        ax.set_ylim(bottom=0)
+        ax.grid()
+
+    axes[0].set_title(f"{path.name[:-len('.timeline.tsv')]}: Resource Timeline")
+
+    fig.tight_layout()
+    fig.savefig(out)
+    plt.close(fig)
+
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="draw the resource timelines sampled by timed.py --sample")
+    parser.add_argument("paths", type=Path, nargs="+",
+                        help=".timeline.tsv files, or directories to "
+                        "search for them")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        tables = sorted(path.rglob("*.timeline.tsv")) if path.is_dir() else [path]
+        for table in tables:
+            print(plot_timeline(table))